@@ -0,0 +1,105 @@
+"""
+Benchmark: BeautifulSoup full-tree parsing vs. the targeted scanner for Google Finance quote pages.
+
+Usage:
+    python bench_gfinance_parse.py [--repeat N]
+    python bench_gfinance_parse.py --save NIFTY_50:INDEXNSE SENSEX:INDEXBOM ...
+
+--save downloads the given quote pages into fixtures/gfinance/ (needs network).
+The benchmark parses every saved fixture with both parsers, checks that they
+extract the same price and previous close, and prints CPU time per page.
+Without saved fixtures it runs on a synthetic page of realistic size and
+structure, and says so.
+"""
+import os
+import sys
+import time
+import statistics
+
+import requests
+
+from gfinance_page import extract_quote, extract_quote_soup
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BASE_DIR, "fixtures", "gfinance")
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+
+def save_fixtures(symbol_codes):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for symbol_code in symbol_codes:
+        resp = requests.get(f"https://www.google.com/finance/quote/{symbol_code}", headers=HEADERS, timeout=10)
+        resp.raise_for_status()
+        path = os.path.join(FIXTURE_DIR, symbol_code.replace(":", "_") + ".html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(resp.text)
+        print(f"Saved {path} ({len(resp.text) / 1024:.0f} KB)")
+
+
+def synthetic_page(size_kb=600):
+    """A page shaped like a quote page: inline scripts, nested divs, the stats table."""
+    row = ('<div class="gyFHrc"><span class="iYuiXc"><div class="mfs7Fc">{label}</div>'
+           '<div class="EY8ABd-OWXEXe-TAWMXe" role="tooltip">Tooltip text for {label}</div></span>'
+           '<div class="P6K39c">{value}</div></div>')
+    stats = "".join(row.format(label=label, value=value) for label, value in [
+        ("Previous close", "24,812.30"), ("Day range", "24,700.10 - 24,901.85"),
+        ("Year range", "21,743.65 - 26,277.35"), ("Market cap", "-"), ("P/E ratio", "-"),
+    ])
+    filler = ('<div class="Gfxi4"><div class="zzDege">Related instrument</div><span class="P2Luy Ez2Ioe">'
+              '+0.42%</span><div class="YMlKec">1,234.50</div></div>')
+    script = '<script nonce="x">AF_initDataCallback({key: \'ds:1\', data:[' + ",".join(["[1.0,2.0,3.0]"] * 40) + ']});</script>'
+    body = []
+    while sum(map(len, body)) < size_kb * 1024 // 2:
+        body.append(filler)
+        body.append(script)
+    head = "".join(body)
+    return ('<!doctype html><html><head><title>NIFTY 50</title>' + head + '</head><body>'
+            '<main><div class="rPF6Lc"><div class="YMlKec fxKbKc">₹24,850.55</div></div>'
+            + stats + head + '</main></body></html>')
+
+
+def load_pages():
+    if os.path.isdir(FIXTURE_DIR):
+        names = sorted(name for name in os.listdir(FIXTURE_DIR) if name.endswith(".html"))
+        if names:
+            pages = []
+            for name in names:
+                with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+                    pages.append((name, f.read()))
+            return pages
+    print("No fixtures in fixtures/gfinance/ (save some with --save); using a synthetic page.\n")
+    return [("synthetic.html", synthetic_page())]
+
+
+def _cpu_ms(fn, page, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        result = fn(page)
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "--save":
+        save_fixtures(args[1:])
+        return
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 20
+
+    pages = load_pages()
+    print(f"{'page':<32}{'KB':>8}{'soup ms':>10}{'scan ms':>10}{'speedup':>9}  same")
+    soup_total = scan_total = 0.0
+    for name, page in pages:
+        soup_ms, soup_result = _cpu_ms(extract_quote_soup, page, max(1, repeat // 10))
+        scan_ms, scan_result = _cpu_ms(extract_quote, page, repeat)
+        soup_total += soup_ms
+        scan_total += scan_ms
+        print(f"{name:<32}{len(page.encode()) / 1024:>8.0f}{soup_ms:>10.2f}{scan_ms:>10.3f}"
+              f"{soup_ms / max(scan_ms, 1e-6):>8.0f}x  {soup_result == scan_result} {scan_result}")
+
+    print(f"\nMean CPU per page: soup {soup_total / len(pages):.2f} ms, scan {scan_total / len(pages):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: per-request CPU time of the price-series routes, row-by-row vs. the history engine.
+
+Usage:
+    python bench_history.py [--repeat N]
+
+Runs offline: ten years of synthetic daily bars are written to a temporary
+OHLCV store, so both sides read the same local data and only the projection
+differs. "legacy" is the previous per-route code (iterrows / insert-padding
+loops) applied to the stored frame; "engine" is the price_history call each
+route now makes. Results are checked for equality before timing.
+
+A second table compares format=rows and format=columnar responses over
+25 weeks, 2 years and 10 years of closes: CPU time to build and serialize
+the JSON body, and its size raw and gzipped.
+"""
+import sys
+import gzip
+import json
+import tempfile
+import time
+import statistics
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import ohlcv_store
+import price_history
+
+TICKER = "BENCH.NS"
+
+
+def _write_store():
+    ohlcv_store.STORE_DIR = tempfile.mkdtemp(prefix="ohlcv-bench-")
+    sessions = pd.bdate_range(end=ohlcv_store.last_final_session(), periods=2600)
+    close = 1000 + np.cumsum(np.random.default_rng(7).normal(0, 8, len(sessions)))
+    bars = {"Date": sessions.values.astype("datetime64[D]").astype(np.int64)}
+    for column in ohlcv_store.COLUMNS:
+        bars[column] = close.copy()
+    ohlcv_store._append(ohlcv_store._ticker_dir(TICKER), bars)
+    ohlcv_store._synced[TICKER] = ohlcv_store.last_final_session()  # no upstream in the benchmark
+
+
+# ---- previous implementations, reading the same store ----
+def legacy_weekprice():
+    df = ohlcv_store.history(TICKER, bars=7)
+    df = df[df['Close'].notna()].tail(7)
+    closing_prices = []
+    for index, row in df.iterrows():
+        closing_prices.append({
+            "date": index.strftime('%Y-%m-%d'),
+            "day": index.strftime('%a'),
+            "closing_price": f"₹{round(row['Close'], 2)}"
+        })
+    return closing_prices
+
+
+def legacy_25week():
+    hist = ohlcv_store.history(TICKER, start=date.today() - timedelta(weeks=25)).reset_index()
+    data = []
+    for idx, row in hist.iterrows():
+        data.append({"week": row['Date'].strftime("%d-%b"), "closing_price": row['Close']})
+    return data
+
+
+def legacy_last25(days=25):
+    close_list = ohlcv_store.history(TICKER, bars=days)["Close"].dropna().tail(days).astype(float).tolist()
+    while len(close_list) < days:
+        close_list.insert(0, close_list[0])
+    return close_list
+
+
+# ---- engine projections used by the routes ----
+def engine_weekprice():
+    return price_history.points(
+        price_history.closes(TICKER, bars=7),
+        date='%Y-%m-%d', day='%a',
+        closing_price=lambda c: [f"₹{value}" for value in np.round(c, 2).tolist()]
+    )
+
+
+def engine_25week():
+    series = price_history.closes(TICKER, start=date.today() - timedelta(weeks=25))
+    return price_history.points(series, week="%d-%b", closing_price=lambda c: c.tolist())
+
+
+def engine_last25(days=25):
+    return price_history.last_closes(TICKER, days, pad=True)
+
+
+CASES = [
+    ("/weekprice (7 daily)", legacy_weekprice, engine_weekprice),
+    ("/25weekprice (~125 daily)", legacy_25week, engine_25week),
+    ("last 25 closes, padded", legacy_last25, engine_last25),
+]
+
+
+FORMAT_RANGES = [("25 weeks", timedelta(weeks=25)), ("2 years", timedelta(days=2 * 365)), ("10 years", timedelta(days=10 * 365))]
+
+
+def _rows_body(series):
+    prices = price_history.points(series, week="%d-%b", closing_price=lambda c: c.tolist())
+    return json.dumps({"symbol": TICKER, "data_points": len(prices), "prices": prices}, sort_keys=True)
+
+
+def _columnar_body(series):
+    return json.dumps({"symbol": TICKER, "data_points": len(series), **price_history.columnar(series)}, sort_keys=True)
+
+
+def _cpu_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    args = sys.argv[1:]
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 200
+    _write_store()
+
+    print(f"{'route':<28}{'legacy ms':>11}{'engine ms':>11}{'speedup':>9}  same")
+    for name, legacy, engine in CASES:
+        same = legacy() == engine()
+        legacy_ms = _cpu_ms(legacy, repeat)
+        engine_ms = _cpu_ms(engine, repeat)
+        print(f"{name:<28}{legacy_ms:>11.3f}{engine_ms:>11.3f}{legacy_ms / engine_ms:>8.1f}x  {same}")
+
+    print(f"\n{'range':<10}{'points':>8}{'format':>10}{'build+json ms':>15}{'KB':>9}{'gzip KB':>9}")
+    for name, span in FORMAT_RANGES:
+        series = price_history.closes(TICKER, start=date.today() - span)
+        for label, body in (("rows", _rows_body), ("columnar", _columnar_body)):
+            payload = body(series).encode()
+            ms = _cpu_ms(lambda: body(series), max(1, repeat // 10))
+            print(f"{name:<10}{len(series):>8}{label:>10}{ms:>15.3f}{len(payload) / 1024:>9.1f}{len(gzip.compress(payload)) / 1024:>9.1f}")
+
+    weekly = price_history.closes(TICKER, start=date.today() - timedelta(weeks=25), frequency="weekly")
+    print(f"\nweekly resample: {len(weekly)} points, {_cpu_ms(lambda: price_history.closes(TICKER, start=date.today() - timedelta(weeks=25), frequency='weekly'), repeat):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
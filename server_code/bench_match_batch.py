@@ -0,0 +1,68 @@
+"""
+Benchmark: /match/batch in-process vs. on the spawned process pool.
+
+Usage:
+    python bench_match_batch.py [path/to/EQUITY_L.csv] [--workers N] [--sizes 64,256,1000]
+
+Without a path the symbol master snapshot is used (downloaded if missing).
+For each batch size, prints the wall time of share_data.match_companies()
+in-process and on a pool of N workers (default: one per core), after one
+warm-up batch so pool start-up is reported separately. Every batch is a
+fresh set of misspelt company names and the match cache is cleared first,
+so neither side is served from memoized results. Results are checked for
+equality.
+"""
+import random
+import sys
+import time
+
+import pandas as pd
+
+import share_data
+import symbol_master
+from match_cache import match_cache
+
+
+def _queries(names, n, rng):
+    """n distinct misspelt company names (one character dropped), like user-typed holdings lists."""
+    queries = []
+    for name in rng.sample(names, n):
+        cut = rng.randrange(len(name))
+        queries.append((name[:cut] + name[cut + 1:]).lower())
+    return queries
+
+
+def _run(queries, workers):
+    share_data.MATCH_WORKERS = workers
+    match_cache.clear()  # in-process results are memoized; workers never saw these queries
+    start = time.perf_counter()
+    results = share_data.match_companies(queries)
+    return (time.perf_counter() - start) * 1000, results
+
+
+def main():
+    args = sys.argv[1:]
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else share_data.MATCH_WORKERS
+    sizes = [int(n) for n in args[args.index("--sizes") + 1].split(",")] if "--sizes" in args else [64, 256, 1000]
+    paths = [a for i, a in enumerate(args) if not a.startswith("--") and (i == 0 or not args[i - 1].startswith("--"))]
+    if paths:
+        symbol_master._install(pd.read_csv(paths[0]), "disk")
+    snapshot = symbol_master.get_snapshot()
+    print(f"Corpus: {len(snapshot.records)} companies, {workers} worker(s)\n")
+
+    rng = random.Random(5)
+    names = list(snapshot.names)
+    startup_ms, _ = _run(_queries(names, share_data.PARALLEL_BATCH_SIZE, rng), workers)  # spawns the pool, loads the corpus per worker
+    print(f"Pool start-up + first batch of {share_data.PARALLEL_BATCH_SIZE}: {startup_ms:.0f} ms\n")
+
+    print(f"{'batch':>6}{'in-process ms':>15}{'pool ms':>10}{'speedup':>9}  same")
+    for size in sizes:
+        queries = _queries(names, size, rng)
+        serial_ms, serial = _run(queries, 1)
+        pooled_ms, pooled = _run(queries, workers)
+        print(f"{size:>6}{serial_ms:>15.1f}{pooled_ms:>10.1f}{serial_ms / pooled_ms:>8.2f}x  {serial == pooled}")
+    share_data._shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
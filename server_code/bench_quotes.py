@@ -0,0 +1,107 @@
+"""
+Benchmark: Ticker.info vs. the minimal quote fetcher for a NIFTY 50 basket.
+
+Usage:
+    python bench_quotes.py [number_of_symbols]
+
+For each symbol both paths fetch last price, previous close and market cap.
+Every HTTP response yfinance receives is counted, so the report shows
+requests and bytes transferred next to latency. The minimal path is measured
+twice: cold (share counts not cached yet) and warm (share counts cached, as
+after the first quote of the day). Needs network access to Yahoo Finance.
+"""
+import sys
+import time
+import statistics
+
+import yfinance as yf
+from curl_cffi import requests as curl_requests
+
+import indivualpolling
+from indivualpolling import fetch_minimal_quote
+
+NIFTY_50 = [
+    "ADANIENT", "ADANIPORTS", "APOLLOHOSP", "ASIANPAINT", "AXISBANK", "BAJAJ-AUTO", "BAJFINANCE",
+    "BAJAJFINSV", "BEL", "BHARTIARTL", "CIPLA", "COALINDIA", "DRREDDY", "EICHERMOT", "ETERNAL",
+    "GRASIM", "HCLTECH", "HDFCBANK", "HDFCLIFE", "HEROMOTOCO", "HINDALCO", "HINDUNILVR", "ICICIBANK",
+    "INDUSINDBK", "INFY", "ITC", "JIOFIN", "JSWSTEEL", "KOTAKBANK", "LT", "M&M", "MARUTI", "NESTLEIND",
+    "NTPC", "ONGC", "POWERGRID", "RELIANCE", "SBILIFE", "SBIN", "SHRIRAMFIN", "SUNPHARMA", "TATACONSUM",
+    "TATAMOTORS", "TATASTEEL", "TCS", "TECHM", "TITAN", "TRENT", "ULTRACEMCO", "WIPRO",
+]
+
+
+class CountingSession(curl_requests.Session):
+    """curl_cffi session that counts requests and response bytes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = 0
+        self.bytes = 0
+
+    def request(self, *args, **kwargs):
+        response = super().request(*args, **kwargs)
+        self.requests += 1
+        self.bytes += len(response.content)
+        return response
+
+
+def info_quote(ticker_symbol):
+    info = yf.Ticker(ticker_symbol).info
+    return info.get("regularMarketPrice"), info.get("previousClose"), info.get("marketCap")
+
+
+def minimal_quote(ticker_symbol):
+    quote = fetch_minimal_quote(ticker_symbol)
+    return quote["price"], quote["previous_close"], quote["market_cap"]
+
+
+def _run(session, fn, tickers):
+    latencies = []
+    session.requests = session.bytes = 0
+    failures = 0
+    for ticker_symbol in tickers:
+        start = time.perf_counter()
+        try:
+            price, _, market_cap = fn(ticker_symbol)
+            failures += price is None or market_cap is None
+        except Exception:
+            failures += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": statistics.median(latencies),
+        "max_ms": max(latencies),
+        "requests": session.requests,
+        "kb": session.bytes / 1024,
+        "failures": failures,
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else len(NIFTY_50)
+    tickers = [symbol + ".NS" for symbol in NIFTY_50[:count]]
+
+    session = CountingSession(impersonate="chrome")
+    yf.Ticker(tickers[0], session=session)  # yfinance keeps one shared session
+
+    # Warm up cookie/crumb so neither path pays for it
+    yf.Ticker(tickers[0]).history(period="1d")
+
+    results = {"Ticker.info": _run(session, info_quote, tickers)}
+    indivualpolling._shares.clear()
+    results["minimal (cold)"] = _run(session, minimal_quote, tickers)
+    results["minimal (warm)"] = _run(session, minimal_quote, tickers)
+
+    print(f"{len(tickers)} symbols\n")
+    print(f"{'path':<18}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}{'requests':>10}{'KB':>10}{'KB/sym':>9}{'failed':>8}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}{r['max_ms']:>10.1f}"
+              f"{r['requests']:>10}{r['kb']:>10.1f}{r['kb'] / len(tickers):>9.1f}{r['failures']:>8}")
+
+    base, warm = results["Ticker.info"], results["minimal (warm)"]
+    print(f"\nWarm minimal path: {base['mean_ms'] / warm['mean_ms']:.1f}x faster, "
+          f"{base['kb'] / max(warm['kb'], 0.001):.1f}x fewer bytes than Ticker.info")
+
+
+if __name__ == "__main__":
+    main()
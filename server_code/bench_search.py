@@ -0,0 +1,83 @@
+"""
+Benchmark: fuzzywuzzy full scan vs. FuzzyIndex for the /match and /price lookups.
+
+Usage:
+    python bench_search.py [path/to/EQUITY_L.csv]
+
+Without an argument the symbol master snapshot is used (downloaded if missing).
+Prints per-query latency for both paths and how many results agree exactly.
+"""
+import sys
+import time
+import statistics
+
+import pandas as pd
+from fuzzywuzzy import process
+
+from search_index import FuzzyIndex
+import symbol_master
+
+QUERIES = [
+    "RELIANCE", "TCS", "HDFC BANK", "INFOSYS", "ICICI", "TATA MOTORS", "BAJAJ FINANCE",
+    "ASIAN PAINTS", "ITC", "LARSEN", "SBIN", "MARUTI", "SUN PHARMA", "WIPRO", "ADANI",
+    "relianse industries", "hdfc bnk", "tata steal", "infosis", "bajaj auto ltd",
+    "HINDUSTAN UNILEVER", "AXIS", "KOTAK MAHINDRA", "POWER GRID", "NTPC", "ONGC",
+    "XYZ", "QWERTY", "A", "GOLD",
+]
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples), max(samples)
+
+
+def main():
+    if len(sys.argv) > 1:
+        df = pd.read_csv(sys.argv[1])
+    else:
+        df = symbol_master.load_symbol_data()
+
+    combined = df['NAME OF COMPANY'].tolist() + df['SYMBOL'].tolist()
+    symbols = df['SYMBOL'].tolist()
+
+    start = time.perf_counter()
+    combined_index = FuzzyIndex(combined)
+    symbol_index = FuzzyIndex(symbols)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Corpus: {len(combined)} choices, index build {build_ms:.1f} ms\n")
+
+    rows = []
+    agree = 0
+    for query in QUERIES:
+        # /match path (top 10 with score >= 60) and /price path (best symbol with score >= 50)
+        def full():
+            return (process.extractBests(query, combined, score_cutoff=60, limit=10),
+                    process.extractOne(query, symbols, score_cutoff=50))
+
+        def fast():
+            return (combined_index.extract_bests(query, score_cutoff=60, limit=10),
+                    symbol_index.extract_one(query, score_cutoff=50))
+
+        same = full() == fast() and process.extract(query, combined, limit=10) == combined_index.extract(query, limit=10)
+        agree += same
+
+        full_ms, _ = _time(full, 3)
+        fast_ms, _ = _time(fast, 3)
+        rows.append((query, full_ms, fast_ms, same))
+
+    print(f"{'query':<22}{'full scan ms':>14}{'index ms':>12}{'speedup':>10}  same")
+    for query, full_ms, fast_ms, same in rows:
+        print(f"{query:<22}{full_ms:>14.2f}{fast_ms:>12.2f}{full_ms / fast_ms:>9.1f}x  {same}")
+
+    full_mean = statistics.mean(r[1] for r in rows)
+    fast_mean = statistics.mean(r[2] for r in rows)
+    print(f"\nMean: full scan {full_mean:.2f} ms, index {fast_mean:.2f} ms ({full_mean / fast_mean:.1f}x)")
+    print(f"Identical results: {agree}/{len(QUERIES)}")
+
+
+if __name__ == "__main__":
+    main()
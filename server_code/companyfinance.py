@@ -1,14 +1,17 @@
 import yfinance as yf
 import pandas as pd
+import numpy as np
 from flask import jsonify
+from datetime import date, timedelta
+from instrument_registry import yahoo_ticker
+import price_history
 
-def stock_info(company: str, symbol: str):
+def stock_info(company: str, symbol: str, exchange: str = "NSE"):
     """
     Fetch stock profile information.
     Returns a JSON-compatible dictionary.
     """
-    symbol_ns = symbol.strip().upper() + ".NS"
-    stock = yf.Ticker(symbol_ns)
+    stock = yf.Ticker(yahoo_ticker(symbol, exchange))
 
     try:
         info = stock.info
@@ -30,13 +33,12 @@ def stock_info(company: str, symbol: str):
         return {"error": f"Error retrieving data: {e}"}
 
 
-def stock_balance(company: str, symbol: str):
+def stock_balance(company: str, symbol: str, exchange: str = "NSE"):
     """
     Fetch stock balance sheet and income statement data.
     Returns a JSON-compatible dictionary.
     """
-    stock_symbol = symbol.strip().upper() + ".NS"
-    stock = yf.Ticker(stock_symbol)
+    stock = yf.Ticker(yahoo_ticker(symbol, exchange))
 
     try:
         balance_sheet = stock.balance_sheet
@@ -96,47 +98,32 @@ def stock_balance(company: str, symbol: str):
 
 
 
-def week_price(symbol: str):
+def week_price(symbol: str, exchange: str = "NSE"):
     """
     Fetches last 7 trading days' closing prices for the given stock symbol.
     
     Args:
-        symbol (str): Stock symbol (e.g., 'INFY')
+        symbol (str): Stock symbol (e.g., 'INFY') or BSE scrip code
+        exchange (str): 'NSE' or 'BSE'
     
     Returns:
         List[dict]: List of dictionaries containing 'date', 'day', and 'closing_price'
     """
-    symbol = symbol.strip().upper() + ".NS"
-    
-    end_date = datetime.datetime.today()
-    start_date = end_date - datetime.timedelta(days=14)  # Last 2 weeks to ensure at least 7 trading days
-    
-    stock = yf.Ticker(symbol)
-    df = stock.history(start=start_date, end=end_date, interval="1d")
-    
-    if df.empty:
-        return []
-    
-    df = df.tail(7)  # Take only last 7 trading days
-    
-    closing_prices = []
-    for index, row in df.iterrows():
-        closing_prices.append({
-            "date": index.strftime('%Y-%m-%d'),
-            "day": index.strftime('%a'),
-            "closing_price": round(row['Close'], 2)
-        })
-    
-    return closing_prices
+    series = price_history.closes(yahoo_ticker(symbol, exchange), bars=7)
+    return price_history.points(
+        series,
+        date='%Y-%m-%d',
+        day='%a',
+        closing_price=lambda c: np.round(c, 2).tolist()
+    )
 
 
-def stock_balance(company: str, symbol: str):
+def stock_balance(company: str, symbol: str, exchange: str = "NSE"):
     """
     Fetch stock balance sheet and income statement data.
     Returns a JSON-compatible dictionary.
     """
-    stock_symbol = symbol.strip().upper() + ".NS"
-    stock = yf.Ticker(stock_symbol)
+    stock = yf.Ticker(yahoo_ticker(symbol, exchange))
 
     try:
         balance_sheet = stock.balance_sheet
@@ -192,24 +179,17 @@ def stock_balance(company: str, symbol: str):
 
 
 
-def f_25_data(symbol):
+def f_25_series(symbol, exchange="NSE", interval="daily"):
+    """Close series over the last 25 weeks, one point per session (or per week with interval="weekly")."""
+    return price_history.closes(
+        yahoo_ticker(symbol, exchange), start=date.today() - timedelta(weeks=25), frequency=interval
+    )
+
+
+def f_25_data(symbol, exchange="NSE", interval="daily"):
     try:
-        symbol_ns = symbol.upper() + ".NS"   # NSE format
-        stock = yf.Ticker(symbol_ns)
-        hist = stock.history(period="25wk")
-
-        if hist.empty:
-            return []
-
-        hist = hist.reset_index()
-
-        data = []
-        for idx, row in hist.iterrows():
-            data.append({
-                "week": row['Date'].strftime("%d-%b"),
-                "closing_price": row['Close']
-            })
-        return data
+        series = f_25_series(symbol, exchange, interval)
+        return price_history.points(series, week="%d-%b", closing_price=lambda c: c.tolist())
 
     except Exception as e:
         print(f"Error fetching 25-week data for {symbol}: {e}")
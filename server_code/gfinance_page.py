@@ -0,0 +1,86 @@
+import html
+import re
+
+from bs4 import BeautifulSoup
+
+# ---------------- Google Finance quote pages ---------------- #
+# A quote page is several hundred KB, and all we read from it is:
+#   <div class="YMlKec fxKbKc">₹24,850.55</div>                      (price)
+#   <div class="mfs7Fc">Previous close</div> ... <div class="P6K39c">24,812.30</div>
+# extract_quote() finds those markers with plain string searches instead of
+# building a BeautifulSoup tree of the whole page. If the markup changes and
+# the scanner misses either field, it falls back to extract_quote_soup() (the
+# previous tree-based parser, also kept for the parse benchmark).
+PRICE_MARKER = 'class="YMlKec fxKbKc"'
+PREVIOUS_CLOSE_LABEL = 'class="mfs7Fc"'
+PREVIOUS_CLOSE_VALUE = 'class="P6K39c"'
+LABEL_WINDOW = 1000  # chars after the label in which its value must appear
+
+_NOT_NUMBER = re.compile(r"[^0-9.\-]")
+
+
+def _number(text):
+    """"₹24,850.55" -> 24850.55; None if there is no number."""
+    try:
+        return float(_NOT_NUMBER.sub("", html.unescape(text)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _div_text(page, marker_at):
+    """Text of the element whose opening tag contains the marker at `marker_at`."""
+    start = page.find(">", marker_at)
+    if start < 0:
+        return None
+    end = page.find("<", start + 1)
+    return page[start + 1:end] if end > start else None
+
+
+def _scan_price(page):
+    at = page.find(PRICE_MARKER)
+    return _number(_div_text(page, at)) if at >= 0 else None
+
+
+def _scan_previous_close(page):
+    at = page.find(PREVIOUS_CLOSE_LABEL)
+    while at >= 0:
+        label = _div_text(page, at)
+        if label is not None and label.strip().lower() == "previous close":
+            value_at = page.find(PREVIOUS_CLOSE_VALUE, at, at + LABEL_WINDOW)
+            return _number(_div_text(page, value_at)) if value_at >= 0 else None
+        at = page.find(PREVIOUS_CLOSE_LABEL, at + 1)
+    return None
+
+
+def extract_price(page: str) -> float | None:
+    """Current price from a quote page."""
+    price = _scan_price(page)
+    return price if price is not None else extract_quote_soup(page)[0]
+
+
+def extract_quote(page: str) -> tuple[float | None, float | None]:
+    """(price, previous close) from a quote page; None for fields not found."""
+    price = _scan_price(page)
+    previous_close = _scan_previous_close(page) if price is not None else None
+    if price is None or previous_close is None:
+        soup_price, soup_previous_close = extract_quote_soup(page)
+        price = price if price is not None else soup_price
+        previous_close = soup_previous_close
+    return price, previous_close
+
+
+def extract_quote_soup(page: str) -> tuple[float | None, float | None]:
+    """Full-tree parser (the previous implementation): slow, but independent of attribute layout."""
+    soup = BeautifulSoup(page, "html.parser")
+    price = previous_close = None
+    price_tag = soup.find("div", class_="YMlKec fxKbKc")
+    if price_tag and price_tag.text:
+        price = _number(price_tag.text)
+    for label in soup.find_all("div", class_="mfs7Fc"):
+        if label.text.strip().lower() == "previous close":
+            parent = label.find_parent("div")
+            value_div = parent.find("div", class_="P6K39c") if parent else None
+            if value_div:
+                previous_close = _number(value_div.text)
+            break
+    return price, previous_close
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from indivualpolling import is_market_open, refresh_quotes, get_eps
+from quote_cache import OPEN_TTL
+
+# ---------------- Hot-symbol poller ---------------- #
+# /price, /marketcap and /livepe record the Yahoo ticker they serve with
+# touch(). Tickers requested within the last IDLE_TTL seconds form the hot
+# set. While the market is open, a background thread refreshes the whole hot
+# set every REFRESH_INTERVAL seconds with one batched download into the quote
+# cache, so requests for hot tickers are answered from memory. REFRESH_INTERVAL
+# must stay below the quote cache's OPEN_TTL, or entries expire between
+# refreshes. When the hot set is full, the least recently requested ticker is
+# evicted. The three settings can be overridden with the HOT_SYMBOLS_MAX,
+# HOT_SYMBOLS_INTERVAL and HOT_SYMBOLS_IDLE_TTL environment variables.
+# A value that does not parse, or an interval that is not below OPEN_TTL, is
+# replaced (with a [WARN]) rather than stopping the server from starting.
+
+
+def _setting(name, default, cast):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        print(f"[WARN] Ignoring {name}={value!r}: not a number; using {default}")
+        return default
+
+
+MAX_SYMBOLS = _setting("HOT_SYMBOLS_MAX", 100, int)
+REFRESH_INTERVAL = _setting("HOT_SYMBOLS_INTERVAL", 10, float)  # seconds
+IDLE_TTL = _setting("HOT_SYMBOLS_IDLE_TTL", 10 * 60, float)  # seconds without a request before a ticker goes cold
+if REFRESH_INTERVAL >= OPEN_TTL:
+    print(f"[WARN] HOT_SYMBOLS_INTERVAL={REFRESH_INTERVAL:g}s is not below the quote cache TTL ({OPEN_TTL}s); "
+          f"using {OPEN_TTL * 0.66:g}s")
+    REFRESH_INTERVAL = OPEN_TTL * 0.66
+
+
+class HotSymbolPoller:
+    def __init__(self, max_symbols=MAX_SYMBOLS, interval=REFRESH_INTERVAL, idle_ttl=IDLE_TTL):
+        if interval >= OPEN_TTL:
+            raise ValueError(f"Refresh interval must be below the quote cache TTL ({OPEN_TTL}s)")
+        self.max_symbols = max_symbols
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        self._hot = OrderedDict()  # ticker -> {"last_request", "kinds"}, least recently requested first
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats = {
+            "touches": {},
+            "evicted_idle": 0,
+            "evicted_capacity": 0,
+            "cycles": 0,
+            "refreshed": 0,
+            "failed_cycles": 0,
+            "last_cycle_at": None,
+            "last_cycle_ms": None,
+            "last_cycle_symbols": 0,
+            "last_error": None,
+        }
+
+    def touch(self, ticker_symbol, kind):
+        """Record a request for `ticker_symbol` through the `kind` route ("price", "marketcap", "pe")."""
+        with self._lock:
+            entry = self._hot.get(ticker_symbol)
+            if entry is None:
+                entry = self._hot[ticker_symbol] = {"last_request": 0.0, "kinds": set()}
+            entry["last_request"] = time.time()
+            entry["kinds"].add(kind)
+            self._hot.move_to_end(ticker_symbol)
+            while len(self._hot) > self.max_symbols:
+                self._hot.popitem(last=False)
+                self._stats["evicted_capacity"] += 1
+            touches = self._stats["touches"]
+            touches[kind] = touches.get(kind, 0) + 1
+
+    def hot_set(self) -> dict:
+        """Evict idle tickers and return {ticker: kinds} for the rest."""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            while self._hot:
+                ticker_symbol, entry = next(iter(self._hot.items()))
+                if entry["last_request"] >= cutoff:
+                    break
+                del self._hot[ticker_symbol]
+                self._stats["evicted_idle"] += 1
+            return {ticker_symbol: set(entry["kinds"]) for ticker_symbol, entry in self._hot.items()}
+
+    def refresh(self):
+        """One poll cycle: refresh quotes for the hot set (and EPS for /livepe tickers)."""
+        hot = self.hot_set()
+        if not hot:
+            return
+        started = time.perf_counter()
+        try:
+            refreshed = refresh_quotes(hot)
+            for ticker_symbol, kinds in hot.items():
+                if "pe" in kinds:
+                    get_eps(ticker_symbol)  # daily cache; only fetched when stale
+            error = None
+        except Exception as e:
+            refreshed = 0
+            error = str(e)
+            print(f"[ERROR] Hot symbol refresh failed: {e}")
+        with self._lock:
+            stats = self._stats
+            stats["cycles"] += 1
+            stats["refreshed"] += refreshed
+            stats["failed_cycles"] += error is not None
+            stats["last_cycle_at"] = time.strftime('%Y-%m-%d %H:%M:%S')
+            stats["last_cycle_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            stats["last_cycle_symbols"] = len(hot)
+            stats["last_error"] = error
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            # Quotes fetched while the market is closed stay cached until the open
+            if is_market_open():
+                self.refresh()
+
+    def start(self):
+        """Start the poll thread once."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._loop, name="hot-symbol-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self) -> dict:
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            stats = dict(self._stats, touches=dict(self._stats["touches"]))
+            hot = [(ticker_symbol, entry) for ticker_symbol, entry in self._hot.items() if entry["last_request"] >= cutoff]
+        stats.update({
+            "running": self._thread is not None and self._thread.is_alive(),
+            "max_symbols": self.max_symbols,
+            "interval": self.interval,
+            "idle_ttl": self.idle_ttl,
+            "size": len(hot),
+            "symbols": [
+                {"ticker": ticker_symbol, "kinds": sorted(entry["kinds"]), "idle_s": round(time.time() - entry["last_request"], 1)}
+                for ticker_symbol, entry in reversed(hot)
+            ],
+        })
+        return stats
+
+
+poller = HotSymbolPoller()
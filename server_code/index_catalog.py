@@ -0,0 +1,119 @@
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+
+import pandas as pd
+
+# ---------------- Index catalog ---------------- #
+# The index lookup tables are small pickles that used to be opened and
+# unpickled inside request handlers and on every price update. They are now
+# loaded once per process and shared as read-only views. Each file's mtime is
+# checked at most every CHECK_INTERVAL seconds, and a file that changed on
+# disk is reloaded and swapped in whole.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_SYMBOLS_PATH = os.path.join(BASE_DIR, "index_symbols.pkl")        # index name -> Google Finance exchange
+INDEX_SYMBOLS_DF_PATH = os.path.join(BASE_DIR, "index_symbols_df.pkl")  # INDEX_NAME / SYMBOL table
+SYMBOLS_INFO_PATH = os.path.join(BASE_DIR, "symbols_info.pkl")          # index name -> Yahoo Finance ticker
+CHECK_INTERVAL = 5  # seconds between mtime checks
+
+
+def _load_mapping(path):
+    with open(path, "rb") as f:
+        return MappingProxyType(dict(pickle.load(f)))
+
+
+def _load_table(path):
+    return pd.read_pickle(path)
+
+
+class _CatalogFile:
+    """One pickle held in memory, reloaded when its mtime changes."""
+
+    def __init__(self, path, loader, empty):
+        self.path = path
+        self.loader = loader
+        self.empty = empty
+        self.value = None
+        self.mtime = None
+        self.checked_at = 0.0
+        self.loaded_at = None
+        self.reloads = 0
+        self.version = 0  # bumped on every successful load
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self.value is not None and now - self.checked_at < CHECK_INTERVAL:
+            return self.value
+
+        with self.lock:
+            if self.value is not None and now - self.checked_at < CHECK_INTERVAL:
+                return self.value
+            self.checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime != self.mtime or self.value is None:
+                    self.value = self.loader(self.path)
+                    if self.mtime is not None:
+                        print(f"[INFO] Reloaded {os.path.basename(self.path)}")
+                        self.reloads += 1
+                    self.mtime = mtime
+                    self.version += 1
+                    self.loaded_at = time.time()
+                    self.last_error = None
+            except Exception as e:
+                # Keep serving the last good copy; fall back to an empty one only if none was ever loaded
+                self.last_error = str(e)
+                print(f"[ERROR] Failed to load {os.path.basename(self.path)}: {e}")
+                if self.value is None:
+                    self.value = self.empty()
+            return self.value
+
+    def status(self) -> dict:
+        return {
+            "path": self.path,
+            "loaded": self.loaded_at is not None,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at).strftime('%Y-%m-%d %H:%M:%S') if self.loaded_at else None,
+            "reloads": self.reloads,
+            "version": self.version,
+            "last_error": self.last_error,
+        }
+
+
+_index_symbols = _CatalogFile(INDEX_SYMBOLS_PATH, _load_mapping, lambda: MappingProxyType({}))
+_index_table = _CatalogFile(INDEX_SYMBOLS_DF_PATH, _load_table, lambda: pd.DataFrame(columns=['INDEX_NAME', 'SYMBOL']))
+_yahoo_symbols = _CatalogFile(SYMBOLS_INFO_PATH, _load_mapping, lambda: MappingProxyType({}))
+
+
+# ---------------- Lookups ---------------- #
+def index_exchanges():
+    """Read-only {index name: exchange} map (index_symbols.pkl), e.g. NIFTY_50 -> INDEXNSE."""
+    return _index_symbols.get()
+
+
+def index_table() -> pd.DataFrame:
+    """The shared INDEX_NAME / SYMBOL table (index_symbols_df.pkl). Callers must not mutate it."""
+    return _index_table.get()
+
+
+def index_table_version() -> int:
+    """Load counter of index_symbols_df.pkl; changes whenever index_table() returns a reloaded table."""
+    _index_table.get()
+    return _index_table.version
+
+
+def yahoo_symbols():
+    """Read-only {index name: Yahoo ticker} map (symbols_info.pkl), e.g. BSE-AUTO -> BSE-AUTO.BO."""
+    return _yahoo_symbols.get()
+
+
+def get_status() -> dict:
+    return {
+        "index_symbols": _index_symbols.status(),
+        "index_symbols_df": _index_table.status(),
+        "symbols_info": _yahoo_symbols.status(),
+    }
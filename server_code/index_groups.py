@@ -0,0 +1,166 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+import index_catalog
+import ohlcv_store
+import price_history
+from single_flight import upstream
+
+# ---------------- /four-group ---------------- #
+# The last DAYS closes of every index in symbols_info.pkl, split into four
+# groups. A build brings the OHLCV store up to date for all index tickers
+# with one batched download (ohlcv_store.sync_many) and reads the closes
+# through price_history, like every other price series. The response is
+# cached until the next daily close has settled (REBUILD_AT on the next
+# weekday). A background thread rebuilds it at that time; a request that
+# finds the cache expired gets the previous response and triggers a rebuild,
+# so only the very first request of a process waits for a download. After a
+# failed rebuild, requests wait RETRY_AFTER seconds before triggering another.
+DAYS = 25
+GROUPS = 4
+REBUILD_AT = ohlcv_store.SESSION_FINAL  # bars become final in the store at this time
+RETRY_AFTER = 5 * 60  # seconds before a request-triggered rebuild is retried after a failure
+
+_cache = {"response": None, "built_at": None, "expires_at": 0.0, "build_ms": None, "tickers": 0, "missing": [], "failed_at": None}
+_lock = threading.Lock()
+_rebuilding = threading.Lock()  # held while a background rebuild runs
+_stop_event = threading.Event()
+_thread = None
+_stats = {"hits": 0, "stale_hits": 0, "builds": 0, "build_errors": 0}
+
+
+def next_rebuild(now=None) -> datetime:
+    """The next weekday REBUILD_AT strictly after `now`."""
+    now = now or datetime.now()
+    candidate = datetime.combine(now.date(), REBUILD_AT)
+    if now >= candidate:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:  # Sat, Sun
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def _closes(ticker_symbol):
+    """Last DAYS closes for one ticker, front-padded with the oldest one; None if there are none."""
+    try:
+        return price_history.last_closes(ticker_symbol, DAYS, pad=True) or None
+    except Exception as e:
+        print(f"[ERROR] /four-group: closes for {ticker_symbol} failed: {e}")
+        return None
+
+
+def _build():
+    indexes = list(index_catalog.yahoo_symbols().items())
+    tickers = sorted({symbol for _, symbol in indexes})
+    started = time.perf_counter()
+    # Tickers the batch could not sync are left out rather than downloaded one by one
+    failed = set(ohlcv_store.sync_many(tickers))
+    closes = {ticker_symbol: _closes(ticker_symbol) for ticker_symbol in tickers if ticker_symbol not in failed}
+    missing = sorted(t for t in tickers if not closes.get(t))
+    if len(missing) == len(tickers):
+        raise RuntimeError("No index data returned")
+
+    group_size = math.ceil(len(indexes) / GROUPS)
+    response = {}
+    for i in range(GROUPS):
+        group_indexes = indexes[i * group_size:(i + 1) * group_size]
+        response[f"group_{i + 1}"] = {name: closes.get(symbol) or [0.0] * DAYS for name, symbol in group_indexes}
+
+    with _lock:
+        _cache.update(
+            response=response,
+            built_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            expires_at=next_rebuild().timestamp(),
+            build_ms=round((time.perf_counter() - started) * 1000, 1),
+            tickers=len(tickers),
+            missing=missing,
+            failed_at=None,
+        )
+        _stats["builds"] += 1
+    if missing:
+        print(f"[WARN] /four-group: no closes for {', '.join(missing)}")
+    return response
+
+
+def rebuild():
+    """Rebuild now; concurrent callers share one download. None if it failed."""
+    try:
+        return upstream.do(("four-group", "all"), _build)
+    except Exception as e:
+        with _lock:
+            _stats["build_errors"] += 1
+            _cache["failed_at"] = time.time()
+        print(f"[ERROR] /four-group rebuild failed: {e}")
+        return None
+
+
+def _cooling_down() -> bool:
+    """True for RETRY_AFTER seconds after a failed rebuild."""
+    with _lock:
+        failed_at = _cache["failed_at"]
+    return failed_at is not None and time.time() - failed_at < RETRY_AFTER
+
+
+def _rebuild_in_background():
+    """Start one background rebuild, unless one is running or the last one failed recently."""
+    if _cooling_down() or not _rebuilding.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            rebuild()
+        finally:
+            _rebuilding.release()
+
+    threading.Thread(target=run, name="four-group-rebuild", daemon=True).start()
+
+
+def get_four_group():
+    """The cached grouped response; built on first use, refreshed in the background once expired."""
+    with _lock:
+        response = _cache["response"]
+        expired = time.time() >= _cache["expires_at"]
+        if response is not None:
+            _stats["stale_hits" if expired else "hits"] += 1
+    if response is None:
+        return None if _cooling_down() else rebuild()
+    if expired:
+        _rebuild_in_background()
+    return response
+
+
+def _loop():
+    rebuild()
+    while not _stop_event.wait(max(1.0, next_rebuild().timestamp() - time.time())):
+        rebuild()
+
+
+def start():
+    """Build once at startup and again after every daily close."""
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _stop_event.clear()
+        _thread = threading.Thread(target=_loop, name="four-group", daemon=True)
+        _thread.start()
+
+
+def stop():
+    _stop_event.set()
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "built_at": _cache["built_at"],
+            "expires_at": datetime.fromtimestamp(_cache["expires_at"]).strftime('%Y-%m-%d %H:%M:%S') if _cache["expires_at"] else None,
+            "build_ms": _cache["build_ms"],
+            "tickers": _cache["tickers"],
+            "missing": list(_cache["missing"]),
+            "rebuilding": _rebuilding.locked(),
+            "last_failure_at": datetime.fromtimestamp(_cache["failed_at"]).strftime('%Y-%m-%d %H:%M:%S') if _cache["failed_at"] else None,
+        }
@@ -1,19 +1,115 @@
+import os
+import json
+import time
+import atexit
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, time as dt_time
-import pickle
 import threading
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process refreshes on its own
+    fcntl = None
+
+import index_catalog
+from gfinance_page import extract_quote
+from tick_history import TickRing
+from single_flight import upstream
 
 # ---------------- Market data setup ---------------- #
-FILE_PATH = r"C:\Users\Admin\Desktop\rangmahal (2)\MarketSutra\server_code\index_symbols.pkl"
+# Index prices are scraped by one background refresher, never by a request.
+# With several worker processes, the one holding an exclusive lock on
+# LOCK_PATH is the only writer: it scrapes every REFRESH_INTERVAL seconds and
+# publishes the result to SHARED_PATH. Every other process follows that file
+# (mtime checked every FOLLOW_INTERVAL seconds) and keeps trying the lock,
+# so a new writer takes over if the old one exits.
+#
+# Every update that changes an index bumps `version`, and each index records
+# the version of its last change, so /livedata?since=<version> can return only
+# the indexes that changed since then. Versions are assigned by the writer and
+# published with the prices, so they agree across workers. Each index also
+# keeps a ring of recent ticks for sparklines (tick_history.TickRing). A tick
+# is recorded only while the market is open and only when the price moved, so
+# closed-market cycles, fallback prices (the last price repeated after a
+# failed scrape) and re-reads of the shared file do not push real ticks out.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 HEADERS = {'User-Agent': 'Mozilla/5.0'}
+REFRESH_INTERVAL = 60  # seconds between scrapes
+FOLLOW_INTERVAL = 5  # seconds between checks of the shared file by non-writers
+STATUS_OPEN = "Market is open"
+STATUS_CLOSED = "Market is closed"
+STALE_AFTER = 3 * REFRESH_INTERVAL  # cached prices older than this are reported stale
+SCRAPE_WORKERS = 8  # concurrent Google Finance requests per refresh
+SCRAPE_TIMEOUT = 5  # seconds per request
+
+# Indexes scraped on each refresh, as index name -> default exchange (used when
+# the index catalog has no entry). The LIVE_INDEXES environment variable
+# overrides the default set: a comma-separated list of names, each optionally
+# NAME:EXCHANGE (exchange defaults to DEFAULT_EXCHANGE), e.g.
+# LIVE_INDEXES=NIFTY_50,SENSEX:INDEXBOM,NIFTY_IT. Set it to "ALL" to scrape
+# every index in the catalog; the cycle time grows with len / SCRAPE_WORKERS,
+# not len.
+DEFAULT_EXCHANGE = "INDEXNSE"
+DEFAULT_LIVE_INDEXES = {
+    "NIFTY_50": "INDEXNSE",
+    "SENSEX": "INDEXBOM",
+    "NIFTY_PHARMA": "INDEXNSE",
+    "BSE-BANK": "INDEXBOM",
+    "NIFTY_BANK": "INDEXNSE",
+    "BSE-HC": "INDEXBOM",
+}
+
+
+def _live_indexes_setting(value):
+    """LIVE_INDEXES from the environment: "ALL", or {name: exchange}; the default set if unset or empty."""
+    if value is None or not value.strip():
+        return dict(DEFAULT_LIVE_INDEXES)
+    if value.strip().upper() == "ALL":
+        return "ALL"
+    indexes = {}
+    for entry in value.split(","):
+        name, _, exchange = entry.strip().partition(":")
+        if name:
+            indexes[name.upper()] = exchange.strip().upper() or DEFAULT_LIVE_INDEXES.get(name.upper(), DEFAULT_EXCHANGE)
+    return indexes
+
+
+LIVE_INDEXES = _live_indexes_setting(os.environ.get("LIVE_INDEXES"))
+LOCK_PATH = os.path.join(BASE_DIR, "live_prices.lock")
+SHARED_PATH = os.path.join(BASE_DIR, "live_prices.json")
 
 cached_data = {
     "prices": {},  # e.g. { "NIFTY 50": {"price": 19725.2, "difference": 24.5, "direction": "↑", "previous_close": 19700.7}, ... }
-    "status": "Loading..."
+    "status": "Loading...",
+    "updated_at": None,  # epoch seconds of the last completed scrape
+    "version": 0,
+    "versions": {}  # index name -> version of its last change
 }
 cache_lock = threading.Lock()
+_ticks = {}  # index name -> TickRing, guarded by cache_lock
+
+_refresher_thread = None
+_refresher_lock = threading.Lock()
+_stop_event = threading.Event()
+_writer_file = None  # open LOCK_PATH while this process is the writer
+_shared_mtime = None
+_last_cycle = {"indexes": 0, "fetched": 0, "ms": None}
+
+# One keep-alive session for all scrapes; its pool holds a connection per worker
+_session = requests.Session()
+_session.headers.update(HEADERS)
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=SCRAPE_WORKERS))
+_scrape_pool = ThreadPoolExecutor(max_workers=SCRAPE_WORKERS, thread_name_prefix="index-scrape")
+
+# Callbacks run after update_prices() with ({name: entry} for changed indexes, status)
+_listeners = []
+
+
+def add_listener(callback):
+    """Call `callback(changed, status)` whenever an update changes an index entry."""
+    _listeners.append(callback)
 
 
 # ---------------- Helper functions ---------------- #
@@ -26,67 +122,54 @@ def market_status():
 
 
 def fetch_price_and_close(symbol_code):
-    """Fetch current price and previous close from Google Finance."""
-    price = None
-    previous_close = None
+    """Fetch current price and previous close from Google Finance (one request per symbol at a time)."""
+    return upstream.do(("gfinance", symbol_code), _fetch_price_and_close, symbol_code)
+
+
+def _fetch_price_and_close(symbol_code):
     try:
         url = f"https://www.google.com/finance/quote/{symbol_code}"
-        resp = requests.get(url, headers=HEADERS, timeout=5)
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # Current price
-        price_tag = soup.find("div", class_="YMlKec fxKbKc")
-        if price_tag and price_tag.text:
-            price = float(price_tag.text.replace(",", "").replace("₹", ""))
-
-        # Previous close
-        labels = soup.find_all("div", class_="mfs7Fc")
-        for label in labels:
-            if label.text.strip().lower() == "previous close":
-                parent = label.find_parent("div")
-                if parent:
-                    value_div = parent.find("div", class_="P6K39c")
-                    if value_div:
-                        text = value_div.text.strip().replace(",", "")
-                        previous_close = float(text)
-                break
+        resp = _session.get(url, timeout=SCRAPE_TIMEOUT)
+        return extract_quote(resp.text)
     except Exception:
-        pass
-    return price, previous_close
+        return None, None
 
 
 # ---------------- Updated update_prices function ---------------- #
+def live_indexes() -> dict:
+    """{index name: exchange} for the indexes configured in LIVE_INDEXES."""
+    catalog = index_catalog.index_exchanges()
+    if LIVE_INDEXES == "ALL":
+        return dict(catalog)
+    return {name: catalog.get(name, exchange) for name, exchange in LIVE_INDEXES.items()}
+
+
 def update_prices():
     try:
-        with open(FILE_PATH, 'rb') as f:
-            symbols = pickle.load(f)
-
-        # Keep only NIFTY_50 (NSE) and SENSEX (BSE)
-        symbols = {
-            "NIFTY_50": symbols.get("NIFTY_50", "INDEXNSE"),
-            "SENSEX": symbols.get("SENSEX", "INDEXBOM"),
-            "NIFTY_PHARMA": symbols.get("NIFTY_PHARMA","INDEXNSE"),
-            "BSE-BANK": symbols.get("BSE-BANK","INDEXBOM"),
-            "NIFTY_BANK": symbols.get("NIFTY_BANK","INDEXNSE"),
-            "BSE-HC": symbols.get("BSE-HC","INDEXBOM")
-            
-        }
-
+        symbols = live_indexes()
     except Exception as e:
         print(f"Error loading symbols: {e}")
         return
 
     is_open = market_status()
-    status_msg = "Market is open" if is_open else "Market is closed"
+    status_msg = STATUS_OPEN if is_open else STATUS_CLOSED
     results = {}
 
-    for name, exchange in symbols.items():
-        symbol_code = f"{name}:{exchange}"
+    # Scrape all indexes concurrently on the bounded pool
+    started = time.perf_counter()
+    symbol_codes = [f"{name}:{exchange}" for name, exchange in symbols.items()]
+    fetched = list(_scrape_pool.map(fetch_price_and_close, symbol_codes))
+    _last_cycle.update(
+        indexes=len(symbol_codes),
+        fetched=sum(1 for price, _ in fetched if price is not None),
+        ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+
+    for name, (fetched_price, fetched_close) in zip(symbols, fetched):
         price = None
         previous_close = None
 
-        # Try to fetch live price and previous close
-        fetched_price, fetched_close = fetch_price_and_close(symbol_code)
+        # Live price and previous close from this cycle
         if fetched_price is not None:
             price = fetched_price
         if fetched_close is not None:
@@ -123,22 +206,177 @@ def update_prices():
             "previous_close": previous_close
         }
 
+    _store(results, status_msg, time.time())
+    print(f"Prices updated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {status_msg}")
+
+
+def _store(results, status_msg, updated_at, version=None, versions=None):
+    """
+    Swap in a new set of prices, record a tick per index whose price moved
+    while the market is open, and notify listeners of the entries that
+    changed. The writer passes no versions and bumps its own counter;
+    followers pass the writer's.
+    """
     with cache_lock:
+        previous = cached_data["prices"]
+        changed = {name: entry for name, entry in results.items() if previous.get(name) != entry}
+        if versions is None:
+            version = cached_data["version"] + 1 if changed else cached_data["version"]
+            versions = {name: cached_data["versions"].get(name, 0) for name in results}
+            versions.update((name, version) for name in changed)
         cached_data["prices"] = results
         cached_data["status"] = status_msg
+        cached_data["updated_at"] = updated_at
+        cached_data["version"] = version
+        cached_data["versions"] = versions
+        if status_msg == STATUS_OPEN:
+            for name, entry in results.items():
+                price = entry.get("price")
+                if price is None:
+                    continue
+                ring = _ticks.get(name)
+                if ring is None:
+                    ring = _ticks[name] = TickRing()
+                if ring.last_price() != price:
+                    ring.append(updated_at, price)
 
-    print(f"Prices updated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {status_msg}")
+    if changed:
+        for callback in _listeners:
+            try:
+                callback(changed, status_msg)
+            except Exception as e:
+                print(f"[ERROR] Price listener failed: {e}")
 
 
-# ---------------- Scheduler & Accessor ---------------- #
-def scheduler(interval=60):
-    """Run the update every `interval` seconds."""
-    while True:
-        update_prices()
-        sleep(interval)
+# ---------------- Single writer across processes ---------------- #
+def _acquire_writer():
+    """True if this process is (or just became) the writer."""
+    global _writer_file
+    if _writer_file is not None:
+        return True
+    if fcntl is None:
+        _writer_file = True
+        return True
+    f = open(LOCK_PATH, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _writer_file = f
+    print(f"[INFO] Live prices writer is process {os.getpid()}")
+    _follow()  # continue the previous writer's version numbers
+    return True
+
+
+def _release_writer():
+    global _writer_file
+    if _writer_file is not None and _writer_file is not True:
+        _writer_file.close()  # closing the file drops the flock
+    _writer_file = None
+
+
+def _publish():
+    """Write the cache to SHARED_PATH atomically for the other processes."""
+    with cache_lock:
+        data = {key: cached_data[key] for key in ("prices", "status", "updated_at", "version", "versions")}
+    tmp_path = f"{SHARED_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, SHARED_PATH)
+
+
+def _follow():
+    """Load SHARED_PATH if the writer has published since the last check."""
+    global _shared_mtime
+    try:
+        mtime = os.path.getmtime(SHARED_PATH)
+        if mtime == _shared_mtime:
+            return
+        with open(SHARED_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _shared_mtime = mtime
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        print(f"[ERROR] Failed to read shared live prices: {e}")
+        return
+    _store(data["prices"], data["status"], data["updated_at"], data.get("version", 0), data.get("versions", {}))
+
+
+# ---------------- Background refresher ---------------- #
+def _refresher_loop(interval):
+    while not _stop_event.is_set():
+        if _acquire_writer():
+            update_prices()
+            try:
+                _publish()
+            except Exception as e:
+                print(f"[ERROR] Failed to publish live prices: {e}")
+            wait = interval
+        else:
+            _follow()
+            wait = min(FOLLOW_INTERVAL, interval)
+        _stop_event.wait(wait)
+    _release_writer()
+
+
+def start_refresher(interval=REFRESH_INTERVAL):
+    """Start the live price refresher thread once per process."""
+    global _refresher_thread
+    with _refresher_lock:
+        if _refresher_thread is not None and _refresher_thread.is_alive():
+            return
+        _stop_event.clear()
+        _refresher_thread = threading.Thread(
+            target=_refresher_loop, args=(interval,), name="live-prices-refresh", daemon=True
+        )
+        _refresher_thread.start()
 
 
-def get_cached_prices():
-    """Return a safe copy of cached data."""
+def stop_refresher(timeout=10):
+    """Stop the refresher, wait for an in-progress scrape and hand the writer lock over."""
+    _stop_event.set()
+    thread = _refresher_thread
+    if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+        thread.join(timeout)
+
+
+atexit.register(stop_refresher)
+
+
+# ---------------- Accessor ---------------- #
+def get_cached_prices(since=None, ticks=0):
+    """
+    Return a safe copy of cached data, with `updated_at` as a timestamp string,
+    `age` in seconds since the last scrape and `stale` when that exceeds STALE_AFTER.
+    With `since`, `prices` holds only the indexes changed after that version
+    (all of them if `since` is ahead of the current version, e.g. after a
+    restart). With `ticks`, `ticks` holds the last n ticks of those indexes.
+    """
     with cache_lock:
-        return cached_data.copy()
+        data = cached_data.copy()
+        versions = data.pop("versions")
+        if since is not None and since <= data["version"]:
+            data["prices"] = {name: entry for name, entry in data["prices"].items() if versions.get(name, 0) > since}
+        if ticks:
+            data["ticks"] = {name: _ticks[name].recent(ticks) for name in data["prices"] if name in _ticks}
+    updated_at = data["updated_at"]
+    age = round(time.time() - updated_at, 1) if updated_at is not None else None
+    data["updated_at"] = datetime.fromtimestamp(updated_at).strftime('%Y-%m-%d %H:%M:%S') if updated_at is not None else None
+    data["age"] = age
+    data["stale"] = age is None or age > STALE_AFTER
+    return data
+
+
+def get_status() -> dict:
+    thread = _refresher_thread
+    return {
+        "running": thread is not None and thread.is_alive(),
+        "writer": _writer_file is not None,
+        "pid": os.getpid(),
+        "refresh_interval": REFRESH_INTERVAL,
+        "stale_after": STALE_AFTER,
+        "workers": SCRAPE_WORKERS,
+        "last_cycle": dict(_last_cycle),
+    }
@@ -0,0 +1,237 @@
+import math
+import threading
+from collections import OrderedDict, deque
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import ohlcv_store
+from single_flight import upstream
+
+# ---------------- Technical indicators ---------------- #
+# SMA, EMA, RSI, MACD, 52-week high/low and volatility per Yahoo ticker, kept
+# as running state so a new daily bar costs O(1) instead of a pass over the
+# whole series. The first request for a ticker seeds the state from every
+# bar in the OHLCV store with whole-array operations. Once a new session is
+# final (ohlcv_store.last_final_session() moves on), the next request syncs
+# the store and applies just the bars added since. The last bar already applied is read again as a check:
+# if its close changed (the store re-downloaded a split ticker), the state is
+# seeded again. Each state keeps its response dict, so a request for an
+# up-to-date ticker does no computation at all.
+#
+# Seeding and updating use the same recurrences: seeding N bars gives the
+# same values as seeding the first one and applying the rest one by one.
+SMA_WINDOWS = (20, 50, 200)
+EMA_SPANS = (12, 26)
+MACD_SPANS = (12, 26, 9)  # fast, slow, signal
+RSI_PERIOD = 14  # Wilder smoothing
+YEAR_BARS = 252  # sessions in 52 weeks
+VOLATILITY_WINDOW = 20  # daily log returns, annualized over YEAR_BARS
+MAX_SYMBOLS = 500  # states kept in memory, least recently requested evicted first
+
+_states = OrderedDict()  # ticker -> IndicatorState
+_lock = threading.Lock()
+_stats = {"hits": 0, "seeds": 0, "reseeds": 0, "bars_applied": 0, "evicted": 0}
+
+
+def _alpha(span):
+    return 2.0 / (span + 1)
+
+
+def _ewm_last(values, alpha):
+    """Last value of the adjust=False exponential average of `values` (first value as the seed)."""
+    return float(pd.Series(values).ewm(alpha=alpha, adjust=False).mean().iloc[-1])
+
+
+def _monotonic(values, first_bar, keep_max):
+    """
+    Deque of (bar, value) for a sliding max (or min) window: the bars no later
+    bar beats, found with one reversed accumulate instead of a pass per bar.
+    """
+    if not len(values):
+        return deque()
+    reverse = values[::-1]
+    best = (np.maximum if keep_max else np.minimum).accumulate(reverse)[::-1]
+    later = np.append(best[1:], -np.inf if keep_max else np.inf)
+    kept = np.flatnonzero(values > later if keep_max else values < later)
+    return deque(zip((first_bar + kept).tolist(), values[kept].tolist()))
+
+
+class IndicatorState:
+    __slots__ = (
+        "bars", "last_day", "last_close", "closes", "next", "sums", "ema", "signal",
+        "avg_gain", "avg_loss", "highs", "lows", "returns", "return_sum", "return_sumsq", "snapshot", "synced"
+    )
+
+    def __init__(self, days, closes, highs, lows):
+        """Seed from whole arrays (int64 days since 1970-01-01, float64 prices), oldest first."""
+        n = len(closes)
+        self.bars = n
+        self.last_day = int(days[-1])
+        self.last_close = float(closes[-1])
+
+        # Ring of the last max(SMA_WINDOWS) closes, with a running sum per window
+        capacity = max(SMA_WINDOWS)
+        self.closes = np.zeros(capacity, dtype=np.float64)
+        recent = closes[-capacity:]
+        self.closes[:len(recent)] = recent
+        self.next = len(recent) % capacity
+        self.sums = [float(closes[-window:].sum()) for window in SMA_WINDOWS]
+
+        ema_series = {span: pd.Series(closes).ewm(alpha=_alpha(span), adjust=False).mean() for span in set(EMA_SPANS + MACD_SPANS[:2])}
+        self.ema = {span: float(series.iloc[-1]) for span, series in ema_series.items()}
+        fast, slow, signal = MACD_SPANS
+        self.signal = _ewm_last((ema_series[fast] - ema_series[slow]).to_numpy(), _alpha(signal))
+
+        changes = np.diff(closes)
+        if len(changes):
+            self.avg_gain = _ewm_last(np.clip(changes, 0, None), 1.0 / RSI_PERIOD)
+            self.avg_loss = _ewm_last(np.clip(-changes, 0, None), 1.0 / RSI_PERIOD)
+        else:
+            self.avg_gain = self.avg_loss = None
+
+        first = max(0, n - YEAR_BARS)
+        self.highs = _monotonic(np.where(np.isnan(highs), closes, highs)[first:], first, keep_max=True)
+        self.lows = _monotonic(np.where(np.isnan(lows), closes, lows)[first:], first, keep_max=False)
+
+        log_returns = np.diff(np.log(closes))[-VOLATILITY_WINDOW:]
+        self.returns = deque(log_returns.tolist(), maxlen=VOLATILITY_WINDOW)
+        self.return_sum = float(log_returns.sum())
+        self.return_sumsq = float(np.square(log_returns).sum())
+        self.snapshot = self._snapshot()
+        self.synced = None  # store session this state was last checked against
+
+    def update(self, day, close, high, low):
+        """Apply one new daily bar in O(1) (amortized for the 52-week window)."""
+        capacity = len(self.closes)
+        for i, window in enumerate(SMA_WINDOWS):
+            self.sums[i] += close
+            if self.bars >= window:
+                self.sums[i] -= self.closes[(self.next - window) % capacity]
+        self.closes[self.next] = close
+        self.next = (self.next + 1) % capacity
+
+        for span in self.ema:
+            self.ema[span] += _alpha(span) * (close - self.ema[span])
+        fast, slow, signal = MACD_SPANS
+        self.signal += _alpha(signal) * (self.ema[fast] - self.ema[slow] - self.signal)
+
+        change = close - self.last_close
+        if self.avg_gain is None:
+            self.avg_gain, self.avg_loss = max(change, 0.0), max(-change, 0.0)
+        else:
+            self.avg_gain += (max(change, 0.0) - self.avg_gain) / RSI_PERIOD
+            self.avg_loss += (max(-change, 0.0) - self.avg_loss) / RSI_PERIOD
+
+        bar = self.bars
+        for window, value, beaten in ((self.highs, high, lambda a, b: a <= b), (self.lows, low, lambda a, b: a >= b)):
+            value = close if math.isnan(value) else value
+            while window and beaten(window[-1][1], value):
+                window.pop()
+            window.append((bar, value))
+            while window[0][0] <= bar - YEAR_BARS:
+                window.popleft()
+
+        log_return = math.log(close / self.last_close)
+        if len(self.returns) == VOLATILITY_WINDOW:
+            leaving = self.returns[0]
+            self.return_sum -= leaving
+            self.return_sumsq -= leaving * leaving
+        self.returns.append(log_return)
+        self.return_sum += log_return
+        self.return_sumsq += log_return * log_return
+
+        self.bars += 1
+        self.last_day = day
+        self.last_close = close
+
+    def _snapshot(self) -> dict:
+        """The response body: values rounded to 2 decimals, None until enough bars exist."""
+        def value(x, bars_needed=1):
+            return round(x, 2) if x is not None and self.bars >= bars_needed else None
+
+        fast, slow, signal = MACD_SPANS
+        macd = self.ema[fast] - self.ema[slow]
+        rsi = None
+        if self.avg_gain is not None and self.bars > RSI_PERIOD:
+            rsi = 100.0 if self.avg_loss == 0 else 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        volatility = None
+        n = len(self.returns)
+        if n == VOLATILITY_WINDOW:
+            variance = max(0.0, (self.return_sumsq - self.return_sum * self.return_sum / n) / (n - 1))
+            volatility = math.sqrt(variance * YEAR_BARS) * 100
+        return {
+            "as_of": (ohlcv_store.EPOCH + timedelta(days=self.last_day)).isoformat(),
+            "bars": self.bars,
+            "close": round(self.last_close, 2),
+            "sma": {str(window): value(total / window, window) for window, total in zip(SMA_WINDOWS, self.sums)},
+            "ema": {str(span): value(self.ema[span], span) for span in EMA_SPANS},
+            "macd": {
+                "macd": value(macd, slow),
+                "signal": value(self.signal, slow + signal - 1),
+                "histogram": value(macd - self.signal, slow + signal - 1),
+            },
+            "rsi": value(rsi),
+            "high_52w": round(self.highs[0][1], 2),
+            "low_52w": round(self.lows[0][1], 2),
+            "volatility": value(volatility),  # annualized %, from VOLATILITY_WINDOW daily log returns
+        }
+
+
+def _bars(frame):
+    days = frame.index.values.astype("datetime64[D]").astype(np.int64)
+    return days, frame["Close"].to_numpy(), frame["High"].to_numpy(), frame["Low"].to_numpy()
+
+
+def _refresh(ticker_symbol):
+    """Seed or update the state for `ticker_symbol` from the store; None if the store has no bars."""
+    with _lock:
+        state = _states.get(ticker_symbol)
+
+    if state is not None:
+        last_date = ohlcv_store.EPOCH + timedelta(days=state.last_day)
+        days, closes, highs, lows = _bars(ohlcv_store.history(ticker_symbol, start=last_date, columns=("High", "Low", "Close")))
+        if len(days) and days[0] == state.last_day and closes[0] == state.last_close:
+            for bar in zip(days[1:].tolist(), closes[1:].tolist(), highs[1:].tolist(), lows[1:].tolist()):
+                state.update(*bar)
+            if len(days) > 1:
+                state.snapshot = state._snapshot()
+                _stats["bars_applied"] += len(days) - 1
+            state.synced = ohlcv_store.synced_through(ticker_symbol)
+            return state
+        print(f"[INFO] Stored history of {ticker_symbol} changed; reseeding indicators")
+        _stats["reseeds"] += 1
+
+    days, closes, highs, lows = _bars(ohlcv_store.history(ticker_symbol, columns=("High", "Low", "Close")))
+    if not len(days):
+        return None
+    state = IndicatorState(days, closes, highs, lows)
+    state.synced = ohlcv_store.synced_through(ticker_symbol)
+    _stats["seeds"] += 1
+    with _lock:
+        _states[ticker_symbol] = state
+        _states.move_to_end(ticker_symbol)
+        while len(_states) > MAX_SYMBOLS:
+            _states.popitem(last=False)
+            _stats["evicted"] += 1
+    return state
+
+
+def get_indicators(ticker_symbol) -> dict | None:
+    """Current indicators for a Yahoo ticker, or None if there is no stored history for it."""
+    through = ohlcv_store.last_final_session()
+    with _lock:
+        state = _states.get(ticker_symbol)
+        if state is not None:
+            _states.move_to_end(ticker_symbol)
+            if state.synced == through:
+                _stats["hits"] += 1
+                return state.snapshot
+    state = upstream.do(("indicators", ticker_symbol), _refresh, ticker_symbol)
+    return state.snapshot if state is not None else None
+
+
+def stats() -> dict:
+    with _lock:
+        return {"symbols": len(_states), "max_symbols": MAX_SYMBOLS, **_stats}
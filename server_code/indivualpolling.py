@@ -1,23 +1,34 @@
 import requests
-from bs4 import BeautifulSoup
-from fuzzywuzzy import process
 import pandas as pd
-from io import BytesIO
 import datetime
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import yfinance as yf
-import pickle
-import traceback
 from flask import jsonify
+from symbol_master import load_symbol_data, get_snapshot
+import index_catalog
+from instrument_registry import yahoo_ticker
+from quote_cache import QuoteCache, describe_age
+from single_flight import upstream
+from gfinance_page import extract_price
+import price_history
 
 # Constants
-DATA_URL = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
 GOOGLE_FINANCE_CLASS = "YMlKec fxKbKc"
 HEADERS = {'User-Agent': 'Mozilla/5.0'}
 
-def load_symbol_data():
-    """Load NSE equity symbol data."""
-    response = requests.get(DATA_URL, headers=HEADERS)
-    return pd.read_csv(BytesIO(response.content))
+# Live quotes, keyed by Yahoo ticker (e.g. "RELIANCE.NS")
+quote_cache = QuoteCache()
+
+# Batch quotes: shares outstanding change rarely, so market cap for /prices is
+# price x cached share count instead of one Ticker.info call per symbol
+SHARES_TTL = 24 * 60 * 60  # seconds
+SHARES_WORKERS = 8
+_shares = {}  # ticker -> (shares or None, fetched_at)
+_shares_lock = threading.Lock()
+_eps = {}  # ticker -> (trailing EPS, fetched_at); failures are not cached
+_eps_lock = threading.Lock()
 
 def is_market_open() -> bool:
     """Check if market is open (Mon-Fri, 9:15 AM - 3:30 PM IST)."""
@@ -28,45 +39,225 @@ def is_market_open() -> bool:
     market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
     return market_open <= now <= market_close
 
-def fetch_live_price(symbol: str) -> tuple[str | None, str]:
+def fetch_live_price(symbol: str, exchange: str = "NSE") -> tuple[str | None, str]:
     """
-    Fetch live price and market cap using yfinance.
+    Fetch live price and market cap using yfinance (through the quote cache).
     Returns a tuple: (price, market_cap)
     - price: string like "2456.50" or None if not found
     - market_cap: string like "15.30T" or "N/A" if not found
     """
+    quote = get_live_quote(symbol, exchange)
+    return quote["price"], quote["market_cap"]
+
+def get_live_quote(symbol: str, exchange: str = "NSE") -> dict:
+    """
+    Price and market cap as in fetch_live_price(), plus `as_of` (when the quote
+    was fetched) and `cache_age` (seconds since then). Failed fetches are not cached.
+    """
+    try:
+        ticker_symbol = yahoo_ticker(symbol, exchange)
+    except Exception as e:
+        print("Price & Market cap fetch error:", e)
+        return {"price": None, "market_cap": "N/A", "as_of": None, "cache_age": None}
+
+    entry = get_quote_entry(ticker_symbol)
+    if entry is None:
+        return {"price": None, "market_cap": "N/A", "as_of": None, "cache_age": None}
+
+    price, market_cap, _ = entry["value"]
+    return {"price": price, "market_cap": market_cap, **describe_age(entry)}
+
+def get_quote_entry(ticker_symbol: str):
+    """
+    Quote cache entry for a Yahoo ticker, fetched on a miss. Its value is
+    (price string, formatted market cap, market cap as a number or None).
+    Returns None when the fetch failed.
+    """
+    entry = quote_cache.get(ticker_symbol)
+    if entry is None:
+        # Concurrent misses for the same ticker share one yfinance call
+        entry = upstream.do(("quote", ticker_symbol), _fetch_and_cache_quote, ticker_symbol)
+    return entry
+
+def _fetch_and_cache_quote(ticker_symbol: str):
+    quote = _fetch_quote(ticker_symbol)
+    if quote[0] is None:
+        return None
+    return quote_cache.put(ticker_symbol, quote, is_market_open())
+
+def _fetch_quote(ticker_symbol: str) -> tuple:
+    """Uncached yfinance call behind get_quote_entry()."""
     try:
-        ticker = yf.Ticker(f"{symbol}.NS")
-        info = ticker.info
-        price = info.get("regularMarketPrice")
+        quote = fetch_minimal_quote(ticker_symbol)
+        price = quote["price"]
         price_str = "{:.2f}".format(price) if price is not None else None
-        market_cap = info.get("marketCap")
-        if market_cap is None:
-            market_cap_str = "N/A"
-        elif market_cap >= 1e12:
-            market_cap_str = f"{market_cap/1e12:.2f}T"
-        elif market_cap >= 1e9:
-            market_cap_str = f"{market_cap/1e9:.2f}B"
-        elif market_cap >= 1e6:
-            market_cap_str = f"{market_cap/1e6:.2f}M"
-        else:
-            market_cap_str = str(market_cap)
-        return price_str, market_cap_str
+        return price_str, format_market_cap(quote["market_cap"]), quote["market_cap"]
     except Exception as e:
         print("Price & Market cap fetch error:", e)
-        return None, "N/A"
+        return None, "N/A", None
+
+def _number(value):
+    """float(value), or None for missing / NaN values."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value
+
+def fetch_minimal_quote(ticker_symbol: str) -> dict:
+    """
+    Last price, previous close and market cap without downloading Ticker.info.
+    One 5-day daily chart request gives the price (the last bar's close, the
+    same field the hot-symbol poller's batched download stores, so a cached
+    quote does not depend on which path wrote it; chart metadata only if there
+    are no bars) and the previous close (the bar before it). Market cap is price x the
+    daily-cached share count. Ticker.info is fetched only to fill whatever is
+    still missing. "source" says which path answered.
+    """
+    ticker = yf.Ticker(ticker_symbol)
+    price = previous_close = market_cap = None
+    try:
+        hist = ticker.history(period="5d", interval="1d", auto_adjust=False)
+        closes = hist["Close"].dropna() if not hist.empty else pd.Series(dtype=float)
+        if len(closes):
+            price = float(closes.iloc[-1])
+        else:
+            price = _number((ticker.get_history_metadata() or {}).get("regularMarketPrice"))
+        if len(closes) >= 2:
+            previous_close = float(closes.iloc[-2])
+    except Exception as e:
+        print(f"[WARN] Chart quote failed for {ticker_symbol}: {e}")
+
+    if price is not None:
+        shares = shares_outstanding([ticker_symbol]).get(ticker_symbol)
+        market_cap = price * shares if shares else None
+
+    source = "chart"
+    if price is None or previous_close is None or market_cap is None:
+        try:
+            info = ticker.info
+            source = "info" if price is None else "chart+info"
+            price = price if price is not None else _number(info.get("regularMarketPrice"))
+            previous_close = previous_close if previous_close is not None else _number(info.get("previousClose"))
+            market_cap = market_cap if market_cap is not None else _number(info.get("marketCap"))
+        except Exception as e:
+            print(f"[WARN] Ticker.info fallback failed for {ticker_symbol}: {e}")
+
+    return {"price": price, "previous_close": previous_close, "market_cap": market_cap, "source": source}
+
+def format_market_cap(market_cap) -> str:
+    """15300000000000 -> "15.30T"; None -> "N/A"."""
+    if market_cap is None:
+        return "N/A"
+    elif market_cap >= 1e12:
+        return f"{market_cap/1e12:.2f}T"
+    elif market_cap >= 1e9:
+        return f"{market_cap/1e9:.2f}B"
+    elif market_cap >= 1e6:
+        return f"{market_cap/1e6:.2f}M"
+    return str(market_cap)
+
+def _fetch_shares(ticker_symbol: str):
+    try:
+        shares = yf.Ticker(ticker_symbol).fast_info["shares"]
+    except Exception as e:
+        print(f"[WARN] Shares outstanding unavailable for {ticker_symbol}: {e}")
+        shares = None
+    with _shares_lock:
+        _shares[ticker_symbol] = (shares, time.time())
+    return shares
+
+def shares_outstanding(ticker_symbols) -> dict:
+    """Shares outstanding per ticker, from the daily cache; misses are fetched in parallel."""
+    now = time.time()
+    with _shares_lock:
+        known = {t: _shares[t][0] for t in ticker_symbols if t in _shares and now - _shares[t][1] < SHARES_TTL}
+    missing = [t for t in ticker_symbols if t not in known]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(SHARES_WORKERS, len(missing))) as pool:
+            fetched = pool.map(lambda t: upstream.do(("shares", t), _fetch_shares, t), missing)
+            known.update(zip(missing, fetched))
+    return known
+
+def _download_closes(ticker_symbols: tuple) -> dict:
+    """Last two daily closes per ticker from one yf.download call."""
+    data = yf.download(
+        tickers=list(ticker_symbols),
+        period="5d",
+        interval="1d",
+        group_by="ticker",
+        auto_adjust=False,
+        progress=False,
+        threads=True
+    )
+    closes = {}
+    for ticker_symbol in ticker_symbols:
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                series = data[ticker_symbol]["Close"].dropna()
+            else:
+                series = data["Close"].dropna()
+        except KeyError:
+            continue
+        if not series.empty:
+            closes[ticker_symbol] = series.tail(2).tolist()
+    return closes
+
+def fetch_batch_quotes(ticker_symbols) -> dict:
+    """
+    Price, change vs previous close and market cap for many tickers with one
+    batched download. Returns {ticker: quote dict or {"error": ...}}.
+    """
+    ticker_symbols = tuple(sorted(set(ticker_symbols)))
+    closes = upstream.do(("batch", ",".join(ticker_symbols)), _download_closes, ticker_symbols)
+    shares = shares_outstanding([t for t in ticker_symbols if t in closes])
+
+    quotes = {}
+    for ticker_symbol in ticker_symbols:
+        values = closes.get(ticker_symbol)
+        if not values:
+            quotes[ticker_symbol] = {"error": "No price data returned"}
+            continue
+        price = values[-1]
+        previous_close = values[-2] if len(values) > 1 else None
+        change = round(price - previous_close, 2) if previous_close else None
+        share_count = shares.get(ticker_symbol)
+        quotes[ticker_symbol] = {
+            "price": "{:.2f}".format(price),
+            "previous_close": "{:.2f}".format(previous_close) if previous_close else None,
+            "change": change,
+            "change_pct": round(change / previous_close * 100, 2) if change is not None else None,
+            "market_cap": format_market_cap(price * share_count if share_count else None),
+        }
+    return quotes
+
+def refresh_quotes(ticker_symbols) -> int:
+    """
+    Re-fetch quotes for many tickers with one batched download and store them
+    in the quote cache, as get_quote_entry() would: the price is the last daily
+    bar's close in both paths. Used by the hot-symbol
+    poller. Returns how many tickers were refreshed.
+    """
+    ticker_symbols = tuple(sorted(set(ticker_symbols)))
+    if not ticker_symbols:
+        return 0
+    closes = upstream.do(("batch", ",".join(ticker_symbols)), _download_closes, ticker_symbols)
+    shares = shares_outstanding([t for t in ticker_symbols if t in closes])
+    market_open = is_market_open()
+    for ticker_symbol, values in closes.items():
+        price = values[-1]
+        share_count = shares.get(ticker_symbol)
+        market_cap = price * share_count if share_count else None
+        quote_cache.put(ticker_symbol, ("{:.2f}".format(price), format_market_cap(market_cap), market_cap), market_open)
+    return len(closes)
 
 def get_stock_info(query: str) -> dict:
     """Return company name, symbol, live price, and market status."""
-    df = load_symbol_data()
-    choices = df['SYMBOL'].tolist() + df['NAME OF COMPANY'].tolist()
-    match, score = process.extractOne(query.upper(), choices)
-    if match in df['SYMBOL'].values:
-        row = df[df['SYMBOL'] == match].iloc[0]
-    else:
-        row = df[df['NAME OF COMPANY'] == match].iloc[0]
-    symbol = row['SYMBOL']
-    company = row['NAME OF COMPANY']
+    snapshot = get_snapshot()
+    match, score = snapshot.symbol_name_index.extract_one(query.upper())
+    pos = snapshot.resolve(match)
+    symbol = snapshot.symbols[pos]
+    company = snapshot.names[pos]
     price = fetch_live_price(symbol)
     return {
         "company": company,
@@ -75,29 +266,48 @@ def get_stock_info(query: str) -> dict:
         "market_status": "Open" if is_market_open() else "Closed"
     }
 
-def get_pe_ratio(symbol: str) -> float | None:
+def get_pe_ratio(symbol: str, exchange: str = "NSE") -> float | None:
+    """Live price / trailing EPS. EPS changes once a quarter and is cached for a day."""
     try:
-        ticker_symbol = symbol.upper() + ".NS"
-        ticker = yf.Ticker(ticker_symbol)
-        shares_outstanding = ticker.info.get("sharesOutstanding")
-        financials = ticker.financials
+        ticker_symbol = yahoo_ticker(symbol, exchange)
+    except Exception as e:
+        print("Error calculating P/E:", e)
+        return None
+    eps = get_eps(ticker_symbol)
+    if not eps:
+        return None
+    entry = get_quote_entry(ticker_symbol)
+    if entry is None:
+        return None
+    return round(float(entry["value"][0]) / eps, 2)
+
+def get_eps(ticker_symbol: str) -> float | None:
+    """Trailing EPS (latest annual net income / shares outstanding), from the daily cache."""
+    with _eps_lock:
+        cached = _eps.get(ticker_symbol)
+    if cached is not None and time.time() - cached[1] < SHARES_TTL:
+        return cached[0]
+    return upstream.do(("eps", ticker_symbol), _fetch_eps, ticker_symbol)
+
+def _fetch_eps(ticker_symbol: str) -> float | None:
+    try:
+        financials = yf.Ticker(ticker_symbol).financials
         if "Net Income" in financials.index:
             latest_net_profit = int(financials.loc["Net Income"].iloc[0])
         else:
             latest_net_profit = None
-        if shares_outstanding and latest_net_profit:
-            earnings = latest_net_profit / shares_outstanding
-            price = ticker.history(period="1d")["Close"].iloc[-1]
-            pe_ratio = price / earnings
-            return round(pe_ratio, 2)
-        else:
+        shares = shares_outstanding([ticker_symbol]).get(ticker_symbol)
+        if not (shares and latest_net_profit):
             return None
     except Exception as e:
         print("Error calculating P/E:", e)
         return None
+    eps = latest_net_profit / shares
+    with _eps_lock:
+        _eps[ticker_symbol] = (eps, time.time())
+    return eps
 
 ############################INDEXPOLLING########################################
-PKL_FILE_PATH = r"C:\Users\Admin\Desktop\rangmahal (2)\MarketSutra\server_code\index_symbols.pkl"
 HEADERS = {'User-Agent': 'Mozilla/5.0'}
 GOOGLE_FINANCE_CLASS = "YMlKec fxKbKc"
 
@@ -111,21 +321,13 @@ def market_status() -> str:
     return "Open" if market_open_time <= now.time() <= market_close_time else "Closed"
 
 def symbols() -> dict:
-    """Load index symbols from pickle file safely."""
-    try:
-        with open(PKL_FILE_PATH, 'rb') as f:
-            symbols_data = pickle.load(f)
-            return dict(symbols_data)
-    except Exception as e:
-        print(f"Error loading symbols: {e}")
-        return {}
+    """Index symbols from the in-memory catalog (index_symbols.pkl)."""
+    return dict(index_catalog.index_exchanges())
 
 def fetch_index_price(index_name=None, symbol=None):
     from flask import jsonify
-    import pickle, requests
-    from bs4 import BeautifulSoup
+    import requests
     from datetime import datetime, time as dt_time
-    FILE_PATH = r"C:\Users\Admin\Desktop\rangmahal (2)\MarketSutra\server_code\index_symbols.pkl"
     HEADERS = {'User-Agent': 'Mozilla/5.0'}
 
     def market_status():
@@ -133,22 +335,16 @@ def fetch_index_price(index_name=None, symbol=None):
         return dt_time(9, 15) <= now.time() <= dt_time(15, 30) and now.strftime("%a") not in ["Sat", "Sun"]
 
     if symbol is None:
-        try:
-            with open(FILE_PATH, 'rb') as f:
-                symbols_dict = pickle.load(f)
-        except Exception as e:
-            return jsonify({"error": f"Error loading pickle file: {e}"})
+        symbols_dict = index_catalog.index_exchanges()
         if not index_name or index_name not in symbols_dict:
-            return jsonify({"error": f"Index '{index_name}' not found in pickle file"})
+            return jsonify({"error": f"Index '{index_name}' not found in index catalog"})
         symbol = symbols_dict[index_name]
 
     symbol_code = f"{index_name}:{symbol}" if index_name else symbol
     try:
         url = f"https://www.google.com/finance/quote/{symbol_code}"
         resp = requests.get(url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        price_tag = soup.find("div", class_="YMlKec fxKbKc")
-        price = float(price_tag.text.replace(",", "").replace("₹", "").strip()) if price_tag else None
+        price = extract_price(resp.text)
     except Exception as e:
         return jsonify({"error": f"Error fetching {symbol_code}: {e}"})
     response = {
@@ -168,75 +364,27 @@ def market_status() -> str:
         return "Closed"
     return "Open" if market_open_time <= now.time() <= market_close_time else "Closed"
 
-PKL_FILE_PATH = r"C:\Users\Admin\Desktop\rangmahal (2)\MarketSutra\server_code\symbols_info.pkl"
-
-def fetch_25_week_prices(index_name, days=25):
-    """Fetch last 'days' closing prices for a given index_name from Yahoo Finance."""
-    try:
-        with open(PKL_FILE_PATH, "rb") as f:
-            symbols_dict = pickle.load(f)
-    except Exception as e:
-        print("[ERROR] Failed to load pickle file:", e)
-        return None
-    symbol = symbols_dict.get(index_name)
+def fetch_25_week_series(index_name, days=25):
+    """Last 'days' closes for a given index_name as a dated series, from the local OHLCV store; None if unavailable."""
+    symbol = index_catalog.yahoo_symbols().get(index_name)
     if not symbol:
         print(f"[ERROR] No symbol found for index_name '{index_name}'")
         return None
-    print(f"[INFO] Fetching {days} days for index '{index_name}' symbol '{symbol}'")
     try:
-        data = yf.download(
-            tickers=symbol,
-            period=f"{days+10}d",
-            interval="1d",
-            progress=False,
-            auto_adjust=False
-        )
-        if data.empty:
-            print(f"[ERROR] No data returned from yfinance for '{symbol}'")
-            return None
-        if isinstance(data.columns, pd.MultiIndex):
-            close_cols = [col for col in data.columns if 'Close' in col]
-            if not close_cols:
-                print(f"[ERROR] No 'Close' column found in multi-index for '{symbol}'")
-                return None
-            close_series = data[close_cols[0]].dropna().tail(days)
-        else:
-            if 'Close' not in data.columns:
-                print(f"[ERROR] No 'Close' column found for '{symbol}'")
-                return None
-            close_series = data['Close'].dropna().tail(days)
-        if close_series.empty:
-            print(f"[ERROR] No valid closing prices for '{symbol}'")
-            return None
-        prices_list = close_series.astype(float).tolist()
-        print(f"[INFO] Last {len(prices_list)} prices for {symbol}: {prices_list[:5]} ...")
-        return prices_list
+        series = price_history.closes(symbol, bars=days)
     except Exception as e:
         print(f"[ERROR] Exception fetching data for symbol '{symbol}': {e}")
         return None
+    if series.empty:
+        print(f"[ERROR] No valid closing prices for '{symbol}'")
+        return None
+    return series
 
-def four_25_week_data(symbol, days=25):
-    """Fetch last 'days' closing prices for a symbol."""
-    try:
-        data = yf.download(
-            tickers=symbol,
-            period=f"{days+10}d",
-            interval="1d",
-            progress=False,
-            auto_adjust=False
-        )
-        if data.empty or 'Close' not in data:
-            ticker = yf.Ticker(symbol)
-            current_price = ticker.history(period="1d")['Close'].iloc[-1]
-            return [float(current_price)] * days
-        close_series = data['Close']
-        if hasattr(close_series, 'columns'):
-            close_series = close_series.iloc[:, 0]
-        close_series = close_series.dropna().tail(days)
-        close_list = close_series.astype(float).tolist()
-        while len(close_list) < days:
-            close_list.insert(0, close_list[0])
-        return close_list
-    except Exception as e:
-        print(f"[ERROR] Failed to fetch {symbol}: {e}")
-        return [0.0] * days
+def fetch_25_week_prices(index_name, days=25):
+    """Last 'days' closing prices for a given index_name, from the local OHLCV store."""
+    series = fetch_25_week_series(index_name, days)
+    if series is None:
+        return None
+    prices_list = series.tolist()
+    print(f"[INFO] Last {len(prices_list)} prices for {index_name}: {prices_list[:5]} ...")
+    return prices_list
@@ -0,0 +1,171 @@
+import os
+import re
+import sys
+import json
+import threading
+from array import array
+
+from symbol_master import get_snapshot
+
+# ---------------- Instrument registry ---------------- #
+# One table of instruments across NSE (the symbol master) and BSE (stk.json,
+# scrip code -> company name). Instruments 0..n-1 are the symbol master rows,
+# in the same order, so a snapshot position is also an instrument id. BSE
+# scrips are attached to those rows when the company names agree, and BSE-only
+# scrips are appended after them. Per instrument the table keeps an interned
+# name and a BSE code in an int array (0 = not on BSE). NSE symbols are read
+# from the snapshot and not copied. The registry is rebuilt when the symbol
+# master version changes.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BSE_CODES_PATH = os.path.join(BASE_DIR, "stk.json")
+
+EXCHANGES = {"NSE": "NSE", "NS": "NSE", "BSE": "BSE", "BO": "BSE", "BOM": "BSE"}
+YAHOO_SUFFIX = {"NSE": ".NS", "BSE": ".BO"}
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+_WORD_FORMS = {"LIMITED": "LTD", "COMPANY": "CO", "CORPORATION": "CORP", "THE": ""}
+
+_registry = None
+_registry_lock = threading.Lock()
+_bse_codes = None
+
+
+def _name_key(name) -> str:
+    """Join key for NSE/BSE names: "Bombay Dyeing & Mfg.Co.Ltd." == "BOMBAY DYEING AND MFG CO LIMITED"."""
+    words = _NON_ALNUM.sub(" ", str(name).upper().replace("&", " AND ")).split()
+    return "".join(_WORD_FORMS.get(word, word) for word in words)
+
+
+def _load_bse_codes() -> dict:
+    global _bse_codes
+    if _bse_codes is None:
+        try:
+            with open(BSE_CODES_PATH, "r", encoding="utf-8") as f:
+                _bse_codes = {int(code): name.strip() for code, name in json.load(f).items()}
+        except Exception as e:
+            print(f"[ERROR] Failed to load BSE scrip codes: {e}")
+            return {}
+    return _bse_codes
+
+
+def parse_exchange(value, default="NSE") -> str:
+    """"NSE"/"NS" or "BSE"/"BO"/"BOM" (any case) -> "NSE" or "BSE". Raises ValueError otherwise."""
+    if value is None or not str(value).strip():
+        return default
+    exchange = EXCHANGES.get(str(value).strip().upper())
+    if exchange is None:
+        raise ValueError(f"Unknown exchange '{value}'. Use NSE or BSE.")
+    return exchange
+
+
+class InstrumentRegistry:
+    """NSE + BSE instruments for one symbol master snapshot. Read-only once built."""
+
+    def __init__(self, snapshot, bse_codes):
+        self.snapshot = snapshot
+        self.version = snapshot.version
+        self.nse_count = len(snapshot.symbols)
+        self.names = [sys.intern(str(name)) for name in snapshot.names]
+        self.bse_codes = array("l", [0]) * self.nse_count
+
+        by_key = {}
+        for pos, name in enumerate(self.names):
+            by_key.setdefault(_name_key(name), pos)
+
+        self.by_bse = {}
+        for code in sorted(bse_codes):
+            name = bse_codes[code]
+            key = _name_key(name)
+            instrument = by_key.get(key)
+            if instrument is None or self.bse_codes[instrument]:
+                instrument = len(self.names)
+                self.names.append(sys.intern(name))
+                self.bse_codes.append(code)
+                by_key.setdefault(key, instrument)
+            else:
+                self.bse_codes[instrument] = code
+            self.by_bse[code] = instrument
+        self.by_key = by_key
+        self.dual_listed = sum(1 for code in self.bse_codes[:self.nse_count] if code)
+
+    def __len__(self):
+        return len(self.names)
+
+    def nse_symbol(self, instrument):
+        return self.snapshot.symbols[instrument] if instrument < self.nse_count else None
+
+    def bse_code(self, instrument):
+        return self.bse_codes[instrument] or None
+
+    def lookup(self, text):
+        """Instrument id for a BSE code, an NSE symbol or a company name, or None."""
+        text = str(text).strip()
+        if text.isdigit():
+            return self.by_bse.get(int(text))
+        pos = self.snapshot.by_symbol.get(text.upper())
+        if pos is not None:
+            return pos
+        return self.by_key.get(_name_key(text))
+
+    def describe(self, instrument) -> dict:
+        nse_symbol = self.nse_symbol(instrument)
+        bse_code = self.bse_code(instrument)
+        exchanges = [exchange for exchange, listed in (("NSE", nse_symbol), ("BSE", bse_code)) if listed]
+        return {
+            "name": self.names[instrument],
+            "nse_symbol": nse_symbol,
+            "bse_code": str(bse_code) if bse_code else None,
+            "exchanges": exchanges,
+        }
+
+    def yahoo_ticker(self, symbol, exchange="NSE") -> str:
+        """
+        Yahoo Finance ticker for an NSE symbol or BSE code on the given exchange,
+        e.g. ("RELIANCE", "BSE") -> "500325.BO", ("500325", "NSE") -> "RELIANCE.NS".
+        Raises ValueError when the instrument is not listed on that exchange.
+        """
+        exchange = parse_exchange(exchange)
+        symbol = str(symbol).strip().upper()
+        instrument = self.lookup(symbol)
+
+        if exchange == "NSE":
+            if not symbol.isdigit():
+                return symbol + YAHOO_SUFFIX["NSE"]  # unknown symbols are passed through as before
+            nse_symbol = self.nse_symbol(instrument) if instrument is not None else None
+            if not nse_symbol:
+                raise ValueError(f"BSE code {symbol} has no NSE listing")
+            return nse_symbol + YAHOO_SUFFIX["NSE"]
+
+        if symbol.isdigit():
+            return symbol + YAHOO_SUFFIX["BSE"]
+        bse_code = self.bse_code(instrument) if instrument is not None else None
+        if not bse_code:
+            raise ValueError(f"{symbol} has no BSE listing")
+        return f"{bse_code}{YAHOO_SUFFIX['BSE']}"
+
+    def status(self) -> dict:
+        return {
+            "version": self.version,
+            "instruments": len(self.names),
+            "nse": self.nse_count,
+            "bse": len(self.by_bse),
+            "dual_listed": self.dual_listed,
+            "bse_only": len(self.names) - self.nse_count,
+        }
+
+
+def get_registry() -> InstrumentRegistry:
+    """The registry for the current symbol master snapshot, rebuilt after a refresh."""
+    global _registry
+    snapshot = get_snapshot()
+    current = _registry
+    if current is not None and current.version == snapshot.version:
+        return current
+    with _registry_lock:
+        if _registry is None or _registry.version != snapshot.version:
+            _registry = InstrumentRegistry(snapshot, _load_bse_codes())
+        return _registry
+
+
+def yahoo_ticker(symbol, exchange="NSE") -> str:
+    return get_registry().yahoo_ticker(symbol, exchange)
@@ -0,0 +1,117 @@
+import threading
+from datetime import datetime
+
+from flask import request
+from flask_socketio import SocketIO, Namespace, emit, join_room, leave_room
+
+import indexfile
+import index_catalog
+
+# ---------------- Live index prices over Socket.IO ---------------- #
+# Clients connect to the /live namespace and subscribe to the indexes they
+# show:  emit("subscribe", {"indexes": ["NIFTY_50", "SENSEX"]}). Each index is
+# a room. After every update_prices() run, each index whose entry changed is
+# sent once to its room as a "prices" event, so the cost per tick is one
+# fan-out per changed index however many clients are connected. A subscribe
+# is answered with the current entries so clients render immediately; only
+# indexes the refresher scrapes (indexfile.live_indexes()) can be subscribed. Prices
+# come from the indexfile refresher, which main_code starts with the app.
+NAMESPACE = "/live"
+
+socketio = None
+_clients = {}  # sid -> set of subscribed index names
+_clients_lock = threading.Lock()
+_stats = {"broadcasts": 0, "last_broadcast_at": None}
+
+
+def _room(index_name):
+    return f"index:{index_name}"
+
+
+def _message(prices, status):
+    return {
+        "prices": prices,
+        "status": status,
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+class LivePricesNamespace(Namespace):
+    def on_connect(self):
+        with _clients_lock:
+            _clients[request.sid] = set()
+
+    def on_disconnect(self, *args):
+        with _clients_lock:
+            _clients.pop(request.sid, None)
+
+    def on_subscribe(self, data):
+        names = (data or {}).get("indexes") or []
+        if isinstance(names, str):
+            names = [names]
+        if not names:
+            emit("error", {"error": "Missing 'indexes'."})
+            return
+        # Only the indexes the refresher scrapes ever get updates
+        live = indexfile.live_indexes()
+        unknown = [name for name in names if name not in live]
+        if unknown:
+            catalog = index_catalog.index_exchanges()
+            not_live = [name for name in unknown if name in catalog]
+            missing = [name for name in unknown if name not in catalog]
+            emit("error", {
+                "error": f"Unknown indexes: {missing}" if missing else f"Indexes not streamed live: {not_live}",
+                "unknown": missing,
+                "not_live": not_live,
+                "live": sorted(live),
+            })
+            return
+
+        for name in names:
+            join_room(_room(name))
+        with _clients_lock:
+            _clients.setdefault(request.sid, set()).update(names)
+
+        cached = indexfile.get_cached_prices()
+        emit("prices", _message({name: cached["prices"][name] for name in names if name in cached["prices"]}, cached["status"]))
+
+    def on_unsubscribe(self, data):
+        names = (data or {}).get("indexes") or []
+        if isinstance(names, str):
+            names = [names]
+        for name in names:
+            leave_room(_room(name))
+        with _clients_lock:
+            _clients.get(request.sid, set()).difference_update(names)
+
+
+def _broadcast(changed, status):
+    """indexfile listener: one "prices" event per changed index, to that index's room."""
+    for name, entry in changed.items():
+        socketio.emit("prices", _message({name: entry}, status), to=_room(name), namespace=NAMESPACE)
+        _stats["broadcasts"] += 1
+    _stats["last_broadcast_at"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def init_socketio(app) -> SocketIO:
+    """Attach Socket.IO to the Flask app and register the /live namespace."""
+    global socketio
+    socketio = SocketIO(app, cors_allowed_origins="*")
+    socketio.on_namespace(LivePricesNamespace(NAMESPACE))
+    indexfile.add_listener(_broadcast)
+    return socketio
+
+
+def get_status() -> dict:
+    with _clients_lock:
+        subscriptions = {}
+        for names in _clients.values():
+            for name in names:
+                subscriptions[name] = subscriptions.get(name, 0) + 1
+        connected = len(_clients)
+    return {
+        "namespace": NAMESPACE,
+        "connected": connected,
+        "subscriptions": subscriptions,
+        **_stats,
+    }
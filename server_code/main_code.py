@@ -7,26 +7,32 @@ import yfinance as yf
 from fuzzywuzzy import process
 import traceback
 import pandas as pd
-import pickle
+import numpy as np
 from datetime import datetime,time as dt_time
 import math as math
 from details import init_db
 from pan_card_details import init_ab
 import pan_card_details
 import indexfile
-from indexfile import get_cached_prices, update_prices, scheduler
+from indexfile import get_cached_prices
 from indivualpolling import fetch_live_price,load_symbol_data,is_market_open
+from indivualpolling import get_live_quote, get_quote_entry, quote_cache, fetch_batch_quotes
 from indivualpolling import get_pe_ratio
 from indivualpolling import fetch_index_price
 from indivualpolling import symbols
-from flask_socketio import SocketIO
+import live_socket
+import tick_history
+import ohlcv_store
+import price_history
+import index_groups
+import indicators
 from share_data import load_symbol_data,match_company
+from share_data import match_companies, MAX_BATCH_SIZE
 from share_data import load_index_data,match_index
 from companyfinance import stock_info,stock_balance
-from indivualpolling import fetch_25_week_prices
+from indivualpolling import fetch_25_week_prices, fetch_25_week_series
 from companyfinance import week_price
-from companyfinance import f_25_data
-from indivualpolling import four_25_week_data
+from companyfinance import f_25_data, f_25_series
 import paymentfile
 from paymentfile import create_order,capture,return_from_paypal,cancel
 #try-news-code here
@@ -34,16 +40,47 @@ from news import finance_news
 from transaction_db import init_transaction_db, insert_transaction,fetch_all_transactions
 from transaction_db import sell_transaction
 from details import check_data_complete
+import symbol_master
+import suggest_index
+import index_catalog
+from single_flight import upstream
+import instrument_registry
+from instrument_registry import parse_exchange
+import hot_symbols
+from collections import Counter
 UPLOAD_FOLDER = r"C:\Users\Admin\Desktop\rangmahal (2)\MarketSutra\server_code\uploads"
-PKL_FILE_PATH = r"C:\Users\Admin\Desktop\rangmahal (2)\MarketSutra\server_code\symbols_info.pkl"
-# Initialize databases
-init_db()
-init_ab()
-init_transaction_db()
+# Spawned worker processes (the /match/batch pool) re-import this module as
+# __mp_main__; only the server process initializes databases.
+if __name__ != "__mp_main__":
+    # Initialize databases
+    init_db()
+    init_ab()
+    init_transaction_db()
+    # Rank typeahead suggestions by how many users hold each symbol
+    suggest_index.seed_popularity(Counter(t["symbol"] for t in fetch_all_transactions()))
+
+
+def start_background_services():
+    """
+    Start the refresher threads. Called only by the process that serves
+    requests (see the __main__ block), never at import: the reloader's
+    watcher process also imports this module and must not take the live
+    prices writer lock, scrape or download anything.
+    """
+    # Load the NSE symbol master once and keep it fresh in the background
+    symbol_master.start_refresher()
+    # Keep quotes for recently requested symbols fresh while the market is open
+    hot_symbols.poller.start()
+    # Scrape index prices in the background; /livedata only reads the cache
+    indexfile.start_refresher()
+    # Build /four-group once now and again after every daily close
+    index_groups.start()
 
 # ✅ Correct usage of __name__ instead of _name_
 app = Flask(__name__)
 CORS(app)
+# Live index prices pushed to subscribed clients (/live namespace)
+socketio = live_socket.init_socketio(app)
 DATABASE = 'transactions.db'
 # ---------------- Existing routes ---------------- #
 app.add_url_rule('/image', 'handle_image', details.handle_image, methods=["POST", "GET"])
@@ -67,11 +104,51 @@ def uploaded_file(filename):
 def health():
     return jsonify({"status": "ok", "message": "Server is running"}), 200
 
+@app.route('/symbols/status')
+def symbols_status():
+    status = symbol_master.get_status()
+    status["index_catalog"] = index_catalog.get_status()
+    status["instruments"] = instrument_registry.get_registry().status() if status["loaded"] else None
+    return jsonify(status), 200
+
+@app.route('/symbols/diff')
+def symbols_diff():
+    """Rows added, removed and changed by the latest symbol master refreshes: /symbols/diff?limit=3"""
+    limit = request.args.get("limit", "1")
+    if not limit.isdigit() or not 1 <= int(limit) <= symbol_master.DIFF_HISTORY:
+        return jsonify({"error": f"'limit' must be a number between 1 and {symbol_master.DIFF_HISTORY}."}), 400
+    return jsonify({"diffs": symbol_master.get_diffs(int(limit))}), 200
+
+@app.route('/symbols/memory')
+def symbols_memory():
+    """Symbol master footprint in the worker that serves this request."""
+    try:
+        return jsonify(symbol_master.memory_report()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ---------------- Market data route ---------------- #
 @app.route('/livedata')
 def ticker():
-    update_prices()
-    return jsonify(get_cached_prices())
+    """
+    Cached index prices with `updated_at`, `age`, `stale` and `version`; never scrapes.
+    /livedata?since=<version> returns only the indexes changed after that version,
+    and &ticks=<n> adds each returned index's last n ticks ({"t": [...], "p": [...]}).
+    """
+    since = request.args.get("since")
+    ticks = request.args.get("ticks", "0")
+    if since is not None and not since.isdigit():
+        return jsonify({"error": "'since' must be a version number."}), 400
+    if not ticks.isdigit() or int(ticks) > tick_history.CAPACITY:
+        return jsonify({"error": f"'ticks' must be a number between 0 and {tick_history.CAPACITY}."}), 400
+    return jsonify(get_cached_prices(int(since) if since is not None else None, int(ticks)))
+
+@app.route('/livedata/status')
+def live_socket_status():
+    """Refresher state in this process, plus Socket.IO clients and broadcasts."""
+    status = live_socket.get_status()
+    status["refresher"] = indexfile.get_status()
+    return jsonify(status), 200
 
 
 @app.route('/match', methods=['GET'])
@@ -83,18 +160,16 @@ def match_company():
         return jsonify({"error": "Missing 'query' parameter."}), 400
 
     try:
-        df = load_symbol_data()
-        combined = df['NAME OF COMPANY'].tolist() + df['SYMBOL'].tolist()
-        matches = process.extract(query, combined, limit=10)
+        snapshot = symbol_master.get_snapshot()
+        matches = snapshot.name_symbol_index.extract_bests(query, score_cutoff=60, limit=10)
 
         results = []
         seen = set()
         for text, score in matches:
             if score < 60:
                 continue
-            rows = df[(df['NAME OF COMPANY'] == text) | (df['SYMBOL'] == text)]
-            for _, row in rows.iterrows():
-                company, symbol = row['NAME OF COMPANY'], row['SYMBOL']
+            for pos in snapshot.positions_for(text):
+                company, symbol = snapshot.names[pos], snapshot.symbols[pos]
                 if (company, symbol) not in seen:
                     results.append({
                         "company": company,
@@ -114,6 +189,7 @@ def match_company():
                 return jsonify({"error": f"Invalid choice. Please choose a number between 1 and {len(results)}."}), 400
 
             selected = results[index]
+            suggest_index.record_hit(selected["symbol"])
             return jsonify({
                 "selected": {
                     "company": selected["company"],
@@ -136,6 +212,70 @@ def match_company():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/match/batch', methods=['POST'])
+def match_batch():
+    """
+    Resolve a list of names in one request.
+    Body: {"queries": ["reliance", "tcs", ...], "alternatives": 3}
+    """
+    data = request.get_json(silent=True) or {}
+    queries = data.get("queries")
+    alternatives = data.get("alternatives", 3)
+
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "'queries' must be a non-empty list."}), 400
+    if len(queries) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} queries per batch."}), 400
+    if not all(isinstance(q, str) for q in queries):
+        return jsonify({"error": "Every query must be a string."}), 400
+    if not isinstance(alternatives, int) or not 0 <= alternatives <= 10:
+        return jsonify({"error": "'alternatives' must be a number between 0 and 10."}), 400
+
+    try:
+        results = match_companies(queries, alternatives)
+        return jsonify({"count": len(results), "results": results})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/suggest', methods=['GET'])
+def suggest():
+    """
+    Typeahead over company names, NSE symbols and index names.
+    Cheap enough to call on every keystroke: /suggest?prefix=tata&limit=10
+    """
+    prefix = request.args.get("prefix", "").strip()
+    if not prefix:
+        return jsonify({"error": "Missing 'prefix' parameter."}), 400
+
+    limit = request.args.get("limit", "10")
+    if not limit.isdigit() or not 1 <= int(limit) <= 50:
+        return jsonify({"error": "'limit' must be a number between 1 and 50."}), 400
+
+    try:
+        suggestions = symbol_master.get_snapshot().prefix_index.search(prefix, int(limit))
+        return jsonify({"prefix": prefix, "suggestions": suggestions})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/instrument', methods=['GET'])
+def instrument():
+    """
+    Exact lookup across NSE and BSE by NSE symbol, BSE scrip code or company name:
+    /instrument?q=RELIANCE, /instrument?q=500325
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing 'q' parameter."}), 400
+
+    try:
+        registry = instrument_registry.get_registry()
+        found = registry.lookup(query)
+        if found is None:
+            return jsonify({"error": f"No instrument found for '{query}'"}), 404
+        return jsonify(registry.describe(found))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 '''
 @app.route('/price', methods=['GET'])
@@ -177,26 +317,38 @@ def price_route():
         return jsonify({"error": "Please provide a 'symbol' parameter"}), 400
 
     try:
-        df = load_symbol_data()
-        symbol_list = df['SYMBOL']
-        match = process.extractOne(symbol, symbol_list)
-        if not match or match[1] < 50:
-            return jsonify({"error": "Symbol not found or match score too low"}), 404
-
-        matched_symbol = match[0]
+        exchange = parse_exchange(request.args.get('exchange'))
+        if symbol.isdigit():
+            # BSE scrip code, looked up exactly
+            if instrument_registry.get_registry().lookup(symbol) is None:
+                return jsonify({"error": f"Unknown BSE code {symbol}"}), 404
+            matched_symbol = symbol
+        else:
+            match = symbol_master.get_snapshot().symbol_index.extract_one(symbol, score_cutoff=50)
+            if not match or match[1] < 50:
+                return jsonify({"error": "Symbol not found or match score too low"}), 404
+            matched_symbol = match[0]
+        ticker_symbol = instrument_registry.yahoo_ticker(matched_symbol, exchange)  # not listed there -> ValueError
+        suggest_index.record_hit(matched_symbol)
+        hot_symbols.poller.touch(ticker_symbol, "price")
 
         # Fetch price and market cap
-        price, market_cap = fetch_live_price(matched_symbol)
-        if price is None:
+        quote = get_live_quote(matched_symbol, exchange)
+        if quote["price"] is None:
             return jsonify({"error": "Could not fetch current price"}), 500
 
         return jsonify({
             "symbol": matched_symbol,
-            "price": price,
-            "market_cap": market_cap,
-            "market_status": "Open" if is_market_open() else "Closed"
+            "exchange": exchange,
+            "price": quote["price"],
+            "market_cap": quote["market_cap"],
+            "market_status": "Open" if is_market_open() else "Closed",
+            "as_of": quote["as_of"],
+            "cache_age": quote["cache_age"]
         })
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -204,6 +356,95 @@ def price_route():
 
 
 
+MAX_PRICE_SYMBOLS = 200
+
+@app.route('/prices', methods=['GET', 'POST'])
+def prices_route():
+    """
+    Quotes for many symbols in one response, resolved exactly (no fuzzy matching).
+    GET  /prices?symbols=TCS,INFY,500325&exchange=NSE
+    POST /prices  {"symbols": ["TCS", "INFY", ...], "exchange": "NSE"}
+    Every requested symbol gets a slot, in order; failures carry an "error" field.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        symbols = data.get("symbols")
+        exchange_arg = data.get("exchange")
+    else:
+        symbols = [s for s in request.args.get("symbols", "").split(",") if s.strip()]
+        exchange_arg = request.args.get("exchange")
+
+    if not isinstance(symbols, list) or not symbols:
+        return jsonify({"error": "'symbols' must be a non-empty list."}), 400
+    if len(symbols) > MAX_PRICE_SYMBOLS:
+        return jsonify({"error": f"At most {MAX_PRICE_SYMBOLS} symbols per request."}), 400
+    if not all(isinstance(s, str) for s in symbols):
+        return jsonify({"error": "Every symbol must be a string."}), 400
+
+    try:
+        exchange = parse_exchange(exchange_arg)
+        registry = instrument_registry.get_registry()
+
+        slots = []
+        for raw in symbols:
+            symbol = raw.strip().upper()
+            known = registry.lookup(symbol) is not None if symbol.isdigit() else symbol in registry.snapshot.by_symbol
+            if not known:
+                slots.append((symbol, None, f"Unknown symbol '{raw}'"))
+                continue
+            try:
+                slots.append((symbol, registry.yahoo_ticker(symbol, exchange), None))
+            except ValueError as e:
+                slots.append((symbol, None, str(e)))
+
+        tickers = [ticker for _, ticker, _ in slots if ticker]
+        quotes = fetch_batch_quotes(tickers) if tickers else {}
+
+        results = []
+        for symbol, ticker, error in slots:
+            if ticker:
+                suggest_index.record_hit(symbol)
+            quote = quotes.get(ticker) if ticker else None
+            if quote is None:
+                quote = {"error": error or "No price data returned"}
+            results.append({"symbol": symbol, "ticker": ticker, **quote})
+
+        return jsonify({
+            "exchange": exchange,
+            "market_status": "Open" if is_market_open() else "Closed",
+            "as_of": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "count": len(results),
+            "quotes": results
+        })
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/price/cache', methods=['GET'])
+def price_cache_stats():
+    """Hit/miss counters of the live quote cache behind /price."""
+    return jsonify(quote_cache.stats()), 200
+
+@app.route('/price/hot', methods=['GET'])
+def hot_symbol_stats():
+    """Hot-symbol poller: tracked tickers, evictions and refresh cycles."""
+    return jsonify(hot_symbols.poller.stats()), 200
+
+
+@app.route('/history/store', methods=['GET'])
+def history_store_stats():
+    """Local OHLCV store: tickers on disk, syncs and bars downloaded."""
+    return jsonify(ohlcv_store.stats()), 200
+
+@app.route('/upstream/stats', methods=['GET'])
+def upstream_stats():
+    """Single-flight counters for yfinance / Google Finance calls, with per-key wait times."""
+    return jsonify(upstream.stats()), 200
+
+
 @app.route('/finance', methods=['GET'])
 def company_finance():
     company_input = request.args.get('company', '').strip()
@@ -211,14 +452,12 @@ def company_finance():
         return jsonify({"error": "Please provide a 'company' parameter"}), 400
 
     try:
-        df = load_symbol_data()
-
-        # Normalize company names in DataFrame
-        df['NAME OF COMPANY'] = df['NAME OF COMPANY'].str.strip().str.upper()
+        exchange = parse_exchange(request.args.get('exchange'))
+        snapshot = symbol_master.get_snapshot()
         company_input_norm = company_input.upper()
 
         # Fuzzy match
-        match = process.extractOne(company_input_norm, df['NAME OF COMPANY'].tolist())
+        match = snapshot.name_index.extract_one(company_input_norm)
 
         if not match:
             return jsonify({"error": "Company not found"}), 404
@@ -227,15 +466,16 @@ def company_finance():
         match_score = match[1]
 
         # Get symbol
-        symbol = df.loc[df['NAME OF COMPANY'] == matched_company, 'SYMBOL'].values[0]
+        symbol = snapshot.symbols[snapshot.by_name[matched_company][0]]
 
         # Call finance functions with parameters
-        balance = stock_balance(company=matched_company, symbol=symbol)
-        info = stock_info(company=matched_company, symbol=symbol)
+        balance = stock_balance(company=matched_company, symbol=symbol, exchange=exchange)
+        info = stock_info(company=matched_company, symbol=symbol, exchange=exchange)
 
         response = {
             "company": matched_company,
             "symbol": symbol,
+            "exchange": exchange,
             "balance_sheet": balance,
             "stock_info": info
         }
@@ -246,6 +486,8 @@ def company_finance():
 
         return jsonify(response)
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 #check the path from here#
@@ -258,18 +500,18 @@ def balance_sheet_route():
         return jsonify({"error": "Please provide a 'company' parameter"}), 400
 
     try:
-        df = load_symbol_data()
-        df['NAME OF COMPANY'] = df['NAME OF COMPANY'].str.strip().str.upper()
+        exchange = parse_exchange(request.args.get('exchange'))
+        snapshot = symbol_master.get_snapshot()
         company_input_norm = company_input.upper()
 
-        match = process.extractOne(company_input_norm, df['NAME OF COMPANY'].tolist())
+        match = snapshot.name_index.extract_one(company_input_norm)
         if not match:
             return jsonify({"error": "Company not found"}), 404
 
         matched_company = match[0]
-        symbol = df.loc[df['NAME OF COMPANY'] == matched_company, 'SYMBOL'].values[0]
+        symbol = snapshot.symbols[snapshot.by_name[matched_company][0]]
 
-        balance = stock_balance(company=matched_company, symbol=symbol)
+        balance = stock_balance(company=matched_company, symbol=symbol, exchange=exchange)
 
         # Include a warning if fuzzy match is low
         response = balance
@@ -278,45 +520,40 @@ def balance_sheet_route():
 
         return jsonify(response)
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500   
 
 
 @app.route('/weekprice', methods=['GET'])
 def week_price():
-    import yfinance as yf
-    import datetime
     from flask import request, jsonify
 
     symbol = request.args.get("symbol", "").strip().upper()
     if not symbol:
         return jsonify({"error": "Missing 'symbol' parameter."}), 400
 
-    stock_symbol = f"{symbol}.NS"
-
     try:
-        stock = yf.Ticker(stock_symbol)
-        end_date = datetime.datetime.today()
-        start_date = end_date - datetime.timedelta(days=60)  # buffer
+        stock_symbol = instrument_registry.yahoo_ticker(symbol, request.args.get("exchange"))
+        output_format = price_history.parse_format(request.args.get("format"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        df = stock.history(start=start_date, end=end_date, interval="1d")
-
-        if df.empty:
+    try:
+        series = price_history.closes(stock_symbol, bars=7)
+        if series.empty:
             return jsonify({"error": f"No trading data available for {stock_symbol}."}), 404
 
-        df = df[df['Close'].notna()]  # remove rows with NaN close
-        df = df.tail(7)
+        if output_format == "columnar":
+            return jsonify({"symbol": symbol, **price_history.columnar(series)}), 200
 
-        if df.empty:
-            return jsonify({"error": f"No valid closing prices for {stock_symbol}."}), 404
-
-        closing_prices = []
-        for index, row in df.iterrows():
-            closing_prices.append({
-                "date": index.strftime('%Y-%m-%d'),
-                "day": index.strftime('%a'),
-                "closing_price": f"₹{round(row['Close'], 2)}"
-            })
+        closing_prices = price_history.points(
+            series,
+            date='%Y-%m-%d',
+            day='%a',
+            closing_price=lambda c: [f"₹{value}" for value in np.round(c, 2).tolist()]
+        )
 
         return jsonify({
             "symbol": symbol,
@@ -333,13 +570,41 @@ def get_25_week_price():
     if not symbol:
         return jsonify({"error": "Missing 'symbol' parameter."}), 400
 
-    data = f_25_data(symbol)
+    try:
+        exchange = parse_exchange(request.args.get("exchange"))
+        instrument_registry.yahoo_ticker(symbol, exchange)
+        interval = request.args.get("interval", "daily").strip().lower()
+        if interval not in price_history.FREQUENCIES:
+            raise ValueError(f"'interval' must be one of {', '.join(price_history.FREQUENCIES)}.")
+        output_format = price_history.parse_format(request.args.get("format"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if output_format == "columnar":
+        try:
+            series = f_25_series(symbol, exchange, interval)
+        except Exception as e:
+            print(f"Error fetching 25-week data for {symbol}: {e}")
+            series = None
+        if series is None or series.empty:
+            return jsonify({"error": f"No data available for {symbol}"}), 404
+        return jsonify({
+            "symbol": symbol,
+            "exchange": exchange,
+            "interval": interval,
+            "data_points": len(series),
+            **price_history.columnar(series)
+        }), 200
+
+    data = f_25_data(symbol, exchange, interval)
 
     if not data:
         return jsonify({"error": f"No data available for {symbol}"}), 404
 
     return jsonify({
         "symbol": symbol,
+        "exchange": exchange,
+        "interval": interval,
         "data_points": len(data),
         "prices": data
     }), 200
@@ -351,35 +616,37 @@ def live_pe_ratio():
         return jsonify({"error": "Missing 'query' parameter."}), 400
 
     try:
-        df = load_symbol_data()
-        df['NAME OF COMPANY'] = df['NAME OF COMPANY'].str.strip().str.upper()
+        exchange = parse_exchange(request.args.get("exchange"))
+        snapshot = symbol_master.get_snapshot()
         query_upper = query.upper()
 
-        choices = df['SYMBOL'].tolist() + df['NAME OF COMPANY'].tolist()
-        match, score = process.extractOne(query_upper, choices)
-
-        if score < 60:
+        best = snapshot.symbol_name_index.extract_one(query_upper, score_cutoff=60)
+        if not best:
             return jsonify({"error": "No matching company found"}), 404
+        match, score = best
 
-        if match in df['SYMBOL'].values:
-            row = df[df['SYMBOL'] == match].iloc[0]
-        elif match in df['NAME OF COMPANY'].str.upper().values:
-            row = df[df['NAME OF COMPANY'].str.upper() == match].iloc[0]
-        else:
+        pos = snapshot.resolve(match)
+        if pos is None:
             return jsonify({"error": "No matching company found"}), 404
 
-        symbol = row['SYMBOL']
-        pe = get_pe_ratio(symbol)
+        company = snapshot.names_upper[pos]
+        symbol = snapshot.symbols[pos]
+        suggest_index.record_hit(symbol)
+        hot_symbols.poller.touch(instrument_registry.yahoo_ticker(symbol, exchange), "pe")
+        pe = get_pe_ratio(symbol, exchange)
 
         if pe is None:
             return jsonify({"error": f"Could not calculate P/E for {symbol}"}), 404
 
         return jsonify({
-            "company": row['NAME OF COMPANY'],
+            "company": company,
             "symbol": symbol,
+            "exchange": exchange,
             "pe_ratio": pe
         }), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -401,9 +668,8 @@ def match_index():
         return jsonify({"error":"Missing 'query' Parameter."}), 400
 
     try:
-        df = load_index_data()
-        combined = df['INDEX_NAME'].tolist() + df['SYMBOL'].tolist()
-        matches = process.extract(query, combined, limit=10)
+        snapshot = symbol_master.get_snapshot()
+        matches = snapshot.index_name_symbol_index.extract_bests(query, score_cutoff=60, limit=10)
 
         results = []
         seen = set()
@@ -412,9 +678,8 @@ def match_index():
         for text, score in matches:
             if score < 60:
                 continue
-            rows = df[(df['INDEX_NAME'] == text) | (df['SYMBOL'] == text)]
-            for _, row in rows.iterrows():
-                index_name, symbol = row['INDEX_NAME'], row['SYMBOL']
+            for pos in snapshot.index_positions_for(text):
+                index_name, symbol = snapshot.index_names[pos], snapshot.index_exchanges[pos]
                 if (index_name, symbol) not in seen:
                     results.append({
                         "index": index_name,
@@ -476,6 +741,16 @@ def get_25_week_prices():
     index_name = request.args.get("index_name")
     if not index_name:
         return jsonify({"error": "Please provide index_name as a query parameter"}), 400
+    try:
+        output_format = price_history.parse_format(request.args.get("format"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if output_format == "columnar":
+        series = fetch_25_week_series(index_name)
+        if series is None:
+            return jsonify({"error": f"No 25-week data found for {index_name}"}), 404
+        return jsonify({"index_name": index_name, **price_history.columnar(series)})
 
     prices = fetch_25_week_prices(index_name)
     if not prices:
@@ -486,31 +761,50 @@ def get_25_week_prices():
         "25_week_prices": prices
     })
 
-@app.route("/four-group", methods=["GET"])
-def four_group():
+@app.route("/indicators", methods=["GET"])
+def indicators_route():
     """
-    Divide all indexes into 4 groups and return their last 25-day closing prices.
+    SMA, EMA, MACD, RSI, 52-week high/low and volatility for a stock, from
+    daily closes. Served from running state that is updated once per new bar.
     """
+    symbol = request.args.get("symbol", "").strip().upper()
+    if not symbol:
+        return jsonify({"error": "Missing 'symbol' parameter."}), 400
+
     try:
-        with open(PKL_FILE_PATH, "rb") as f:
-            symbols_dict = pickle.load(f)
-    except Exception as e:
-        return jsonify({"error": f"Failed to load symbols: {e}"}), 500
+        stock_symbol = instrument_registry.yahoo_ticker(symbol, request.args.get("exchange"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    indexes = list(symbols_dict.items())
-    total_indexes = len(indexes)
-    group_size = math.ceil(total_indexes / 4)
+    try:
+        values = indicators.get_indicators(stock_symbol)
+        if values is None:
+            return jsonify({"error": f"No trading data available for {stock_symbol}."}), 404
+        return jsonify({"symbol": symbol, "ticker": stock_symbol, **values}), 200
+    except Exception as e:
+        return jsonify({"error": f"Error computing indicators for {stock_symbol}: {str(e)}"}), 500
 
-    response = {}
-    for i in range(4):
-        group_indexes = indexes[i*group_size:(i+1)*group_size]
-        group_data = {}
-        for name, symbol in group_indexes:
-            group_data[name] = four_25_week_data(symbol)
-        response[f"group_{i+1}"] = group_data
+@app.route("/indicators/status", methods=["GET"])
+def indicators_status():
+    """Indicator states in memory, seeds and bars applied incrementally."""
+    return jsonify(indicators.stats()), 200
 
+@app.route("/four-group", methods=["GET"])
+def four_group():
+    """
+    Divide all indexes into 4 groups and return their last 25-day closing prices.
+    Served from the index_groups cache, which is rebuilt after every daily close.
+    """
+    response = index_groups.get_four_group()
+    if response is None:
+        return jsonify({"error": "Index data is not available yet"}), 503
     return jsonify(response)
 
+@app.route("/four-group/status", methods=["GET"])
+def four_group_status():
+    """When /four-group was last built, how long it took and when it expires."""
+    return jsonify(index_groups.stats()), 200
+
 @app.route("/marketcap", methods=["GET"])
 def marketcap():
     """
@@ -522,21 +816,20 @@ def marketcap():
         return jsonify({"error": "Company name is required"}), 400
 
     try:
-        df = load_symbol_data()
+        exchange = parse_exchange(request.args.get("exchange"))
+        snapshot = symbol_master.get_snapshot()
 
         # Fuzzy match
-        choices = df['SYMBOL'].tolist() + df['NAME OF COMPANY'].tolist()
-        match, score = process.extractOne(company_name.upper(), choices)
+        match, score = snapshot.symbol_name_index.extract_one(company_name.upper())
 
         # Get symbol
-        if match in df['SYMBOL'].values:
-            symbol = match
-        else:
-            symbol = df[df['NAME OF COMPANY'] == match]['SYMBOL'].iloc[0]
+        symbol = snapshot.symbols[snapshot.resolve(match)]
 
         # Fetch market cap
-        ticker = yf.Ticker(symbol + ".NS")
-        market_cap = ticker.info.get("marketCap")
+        ticker_symbol = instrument_registry.yahoo_ticker(symbol, exchange)
+        hot_symbols.poller.touch(ticker_symbol, "marketcap")
+        entry = get_quote_entry(ticker_symbol)
+        market_cap = entry["value"][2] if entry is not None else None
         if market_cap:
             market_cap = round(market_cap / 1000, 2)
         else:
@@ -545,9 +838,12 @@ def marketcap():
         return jsonify({
             "company": company_name,
             "symbol": symbol,
+            "exchange": exchange,
             "market_cap": market_cap
         })
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -572,6 +868,10 @@ def add_transaction_route():
         # Insert into DB
         #insert_transaction(uid, company, symbol, amount, sector, shares)
         insert_transaction(uid, company, symbol,sector, shares)
+        # Only listed symbols count towards popularity; anything else would grow the counter unbounded
+        key = str(symbol).strip().upper()
+        if key in symbol_master.get_snapshot().by_symbol or key in index_catalog.index_exchanges():
+            suggest_index.record_hit(key)
 
         return jsonify({"status": "success", "message": "Transaction added"}), 200
 
@@ -614,5 +914,11 @@ app.add_url_rule('/cancel', 'cancel_payment', paymentfile.cancel, methods=["GET"
 app.add_url_rule('/check', 'check-in',details.check_data_complete,methods=["POST"])
 # ---------------- Run server ---------------- #
 # ✅ Correct usage of __name__ and __main__
+USE_RELOADER = True
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=False, use_reloader=True)
+    # With the reloader this block runs twice: in the watcher process, and in
+    # the child it starts (WERKZEUG_RUN_MAIN=true), which serves requests.
+    if not USE_RELOADER or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
+    socketio.run(app, host="0.0.0.0", port=5000, debug=False, use_reloader=USE_RELOADER, allow_unsafe_werkzeug=True)
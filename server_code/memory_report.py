@@ -0,0 +1,55 @@
+import os
+import sys
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# ---------------- Memory accounting ---------------- #
+# Rough per-object sizes for the /symbols/memory report. Objects reachable
+# from several places (interned strings, shared lists) are counted once per
+# `seen` set, so sizing components in sequence with one set reports what each
+# component adds on top of the ones before it.
+
+
+def deep_size(obj, seen=None) -> int:
+    """Bytes held by `obj` and everything it references (not already in `seen`)."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # Views report only their header; the buffer is counted with the base array
+        return sys.getsizeof(obj) + (deep_size(obj.base, seen) if obj.base is not None else 0)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(np.sum(obj.memory_usage(deep=True)))
+    if isinstance(obj, (str, bytes, int, float, array)) or obj is None:
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    else:
+        if hasattr(obj, "__dict__"):
+            size += deep_size(vars(obj), seen)
+        for slot in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, slot):
+                size += deep_size(getattr(obj, slot), seen)
+    return size
+
+
+def process_rss() -> int | None:
+    """Resident set size of this worker process in bytes (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+def megabytes(size) -> float | None:
+    return round(size / (1024 * 1024), 2) if size is not None else None
@@ -0,0 +1,341 @@
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, time as dt_time
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; appends are still filtered by date
+    fcntl = None
+
+from single_flight import upstream
+
+# ---------------- Local OHLCV store ---------------- #
+# Daily bars per Yahoo ticker, kept on disk so history endpoints read files
+# instead of downloading months of bars on every request. Each ticker is a
+# directory of raw column files: date as int64 days since 1970-01-01, and
+# open/high/low/close/volume as float64. Files are appended to in place.
+# A sync downloads just the bars after the last stored date, plus the last
+# stored bar itself as a check: if its close no longer matches (a split
+# rewrote the history), the ticker is downloaded again from scratch and the
+# new files are renamed over the old ones (see _replace()).
+# sync_many() does the same for a list of tickers from one yf.download.
+#
+# Only completed sessions are stored. A bar counts as final after
+# SESSION_FINAL (16:00, after the closing auction), so during market hours
+# the history ends at the previous session. Closes are unadjusted for
+# dividends (auto_adjust=False): adjusted closes change retroactively and
+# cannot be appended to.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(BASE_DIR, "ohlcv")
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+INITIAL_PERIOD_DAYS = 2 * 365  # backfill for a ticker seen for the first time
+SESSION_FINAL = dt_time(16, 0)
+SPLIT_TOLERANCE = 0.005  # relative close mismatch that triggers a full re-download
+EPOCH = date(1970, 1, 1)
+REPLACE_MARKER = "replace.ready"  # written once every temporary column file of a replace is complete
+
+_synced = {}  # ticker -> last session date the store was synced through (this process)
+_write_lock = threading.Lock()
+_stats = {"reads": 0, "syncs": 0, "syncs_skipped": 0, "bars_fetched": 0, "rebuilds": 0, "sync_errors": 0, "batch_downloads": 0}
+
+
+def _ticker_dir(ticker_symbol):
+    return os.path.join(STORE_DIR, quote(ticker_symbol, safe=""))
+
+
+def _column_path(directory, column):
+    return os.path.join(directory, f"{column.lower()}.f8" if column != "Date" else "date.i8")
+
+
+def last_final_session(now=None):
+    """Date of the most recent weekday session whose daily bar is final."""
+    now = now or datetime.now()
+    day = now.date() if now.time() >= SESSION_FINAL else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:  # Sat, Sun
+        day -= timedelta(days=1)
+    return day
+
+
+@contextmanager
+def _locked(directory, exclusive):
+    """Hold the ticker's file lock: exclusive for writers, shared for readers."""
+    with open(os.path.join(directory, ".lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def _read_files(directory, columns=COLUMNS):
+    arrays = {}
+    for column, dtype in (("Date", np.int64),) + tuple((c, np.float64) for c in columns):
+        path = _column_path(directory, column)
+        arrays[column] = np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.empty(0, dtype=dtype)
+    rows = min(len(values) for values in arrays.values())
+    return {column: values[:rows] for column, values in arrays.items()}
+
+
+def _read(directory, columns=COLUMNS):
+    """{"Date": int64 days, column: float64...}, trimmed to the rows present in every column read."""
+    if not os.path.isdir(directory):
+        return _read_files(directory, columns)
+    with _locked(directory, exclusive=False):
+        return _read_files(directory, columns)
+
+
+def _finish_replace(directory):
+    """
+    Move the temporary column files of a replace into place, the date column
+    last, if the replace got as far as writing its marker; otherwise delete
+    them. Called with the exclusive lock held, so it also completes a replace
+    that was interrupted part way through the renames.
+    """
+    marker = os.path.join(directory, REPLACE_MARKER)
+    committed = os.path.exists(marker)
+    for column in COLUMNS + ("Date",):
+        path = _column_path(directory, column)
+        if os.path.exists(path + ".tmp"):
+            if committed:
+                os.replace(path + ".tmp", path)
+            else:
+                os.remove(path + ".tmp")
+    if committed:
+        os.remove(marker)
+
+
+def _replace(directory, bars):
+    """
+    Swap the stored history for `bars`: every column is written to a
+    temporary file in the same directory first, then a marker records that
+    the set is complete, and only then are the files renamed over the old
+    ones. Readers hold the shared lock, so they see the old history or the
+    new one, never a mix.
+    """
+    for column in ("Date",) + COLUMNS:
+        with open(_column_path(directory, column) + ".tmp", "wb") as f:
+            bars[column].tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+    open(os.path.join(directory, REPLACE_MARKER), "wb").close()
+    _finish_replace(directory)
+    return len(bars["Date"])
+
+
+def _append(directory, bars, replace=False):
+    """
+    Append bars (same layout as _read) after the last stored date, under the
+    exclusive file lock; with `replace`, swap them in for the whole history.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with _write_lock, _locked(directory, exclusive=True):
+        _finish_replace(directory)
+        if replace:
+            return _replace(directory, bars)
+        stored = _read_files(directory)
+        rows = len(stored["Date"])
+        # Drop a partial write left by an interrupted append, and bars another process already added
+        for column in ("Date",) + COLUMNS:
+            path = _column_path(directory, column)
+            with open(path, "ab") as f:
+                if f.tell() != rows * 8:
+                    f.truncate(rows * 8)
+        keep = bars["Date"] > stored["Date"][-1] if rows else np.ones(len(bars["Date"]), dtype=bool)
+        if keep.any():
+            for column in ("Date",) + COLUMNS:
+                with open(_column_path(directory, column), "ab") as f:
+                    bars[column][keep].tofile(f)
+        return int(keep.sum())
+
+
+def _frame_bars(df, end):
+    """Daily bars of a yfinance frame dated on or before `end`, as arrays; None if there are none."""
+    if df is None or df.empty:
+        return None
+    df = df[df["Close"].notna()]
+    dates = df.index.tz_localize(None) if df.index.tz is not None else df.index
+    days = dates.values.astype("datetime64[D]").astype(np.int64)
+    keep = days <= (end - EPOCH).days
+    if not keep.any():
+        return None
+    bars = {"Date": days[keep]}
+    for column in COLUMNS:
+        bars[column] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+    return bars
+
+
+def _download(ticker_symbol, start, end):
+    """Daily bars for start <= date <= end as arrays, or None if nothing came back."""
+    df = yf.Ticker(ticker_symbol).history(
+        start=start.isoformat(), end=(end + timedelta(days=1)).isoformat(),
+        interval="1d", auto_adjust=False, actions=False
+    )
+    return _frame_bars(df, end)
+
+
+def _download_many(ticker_symbols, start, end):
+    """One yf.download for several tickers: {ticker: bars or None} for start <= date <= end."""
+    data = yf.download(
+        tickers=list(ticker_symbols),
+        start=start.isoformat(),
+        end=(end + timedelta(days=1)).isoformat(),
+        interval="1d",
+        group_by="ticker",
+        auto_adjust=False,
+        actions=False,
+        progress=False,
+        threads=True
+    )
+    batched = isinstance(data.columns, pd.MultiIndex)
+    fetched = {}
+    for ticker_symbol in ticker_symbols:
+        try:
+            frame = data[ticker_symbol] if batched else data
+        except KeyError:
+            frame = None
+        fetched[ticker_symbol] = _frame_bars(frame, end)
+    return fetched
+
+
+def _since(bars, start):
+    """The bars dated on or after `start`, or None if there are none."""
+    if bars is None:
+        return None
+    keep = bars["Date"] >= (start - EPOCH).days
+    return {column: values[keep] for column, values in bars.items()} if keep.any() else None
+
+
+def _first_needed(stored, through):
+    """The first date a sync has to download: the last stored bar (as the overlap check), or the backfill start."""
+    if not len(stored["Date"]):
+        return through - timedelta(days=INITIAL_PERIOD_DAYS)
+    return EPOCH + timedelta(days=int(stored["Date"][-1]))
+
+
+def _sync(ticker_symbol, through, fetched=None):
+    """
+    Bring the store for `ticker_symbol` up to session `through`. Returns bars
+    added, None if the download failed. `fetched`: bars already downloaded
+    by sync_many(), used instead of a download of this ticker.
+    """
+    def fetch(start):
+        if fetched is not None:
+            return _since(fetched, start)
+        return _download(ticker_symbol, start, through)
+
+    directory = _ticker_dir(ticker_symbol)
+    stored = _read(directory)
+    if not len(stored["Date"]):
+        bars = fetch(_first_needed(stored, through))
+        return _append(directory, bars) if bars is not None else None
+
+    last_day = int(stored["Date"][-1])
+    last_date = EPOCH + timedelta(days=last_day)
+    if last_date >= through:
+        return 0
+    bars = fetch(last_date)
+    if bars is None:
+        return None
+
+    # The overlapping bar must still match what was stored, or history was rewritten
+    overlap = np.flatnonzero(bars["Date"] == last_day)
+    if len(overlap):
+        stored_close = stored["Close"][-1]
+        fetched_close = bars["Close"][overlap[0]]
+        if abs(fetched_close - stored_close) > SPLIT_TOLERANCE * abs(stored_close):
+            print(f"[INFO] History of {ticker_symbol} changed upstream (close {stored_close} -> {fetched_close}); re-downloading")
+            _stats["rebuilds"] += 1
+            bars = _download(ticker_symbol, through - timedelta(days=INITIAL_PERIOD_DAYS), through)
+            return _append(directory, bars, replace=True) if bars is not None else None
+    return _append(directory, bars)
+
+
+def _record_sync(ticker_symbol, through, added):
+    if added is None:
+        # Nothing downloaded (network error, unknown ticker, holiday with an empty reply): retry next request
+        _stats["sync_errors"] += 1
+        return 0
+    _synced[ticker_symbol] = through
+    _stats["syncs"] += 1
+    _stats["bars_fetched"] += added
+    return added
+
+
+def sync(ticker_symbol):
+    """Fetch bars missing from the store, at most once per session per process."""
+    through = last_final_session()
+    if _synced.get(ticker_symbol) == through:
+        _stats["syncs_skipped"] += 1
+        return 0
+    try:
+        added = upstream.do(("ohlcv", ticker_symbol), _sync, ticker_symbol, through)
+    except Exception as e:
+        added = None
+        print(f"[ERROR] OHLCV sync failed for {ticker_symbol}: {e}")
+    return _record_sync(ticker_symbol, through, added)
+
+
+def sync_many(ticker_symbols):
+    """
+    sync() for several tickers with one batched download covering all of
+    them, from the earliest date any of them needs. Returns the tickers
+    that could not be synced.
+    """
+    through = last_final_session()
+    pending = [t for t in dict.fromkeys(ticker_symbols) if _synced.get(t) != through]
+    _stats["syncs_skipped"] += len(ticker_symbols) - len(pending)
+    if not pending:
+        return []
+    start = min(_first_needed(_read(_ticker_dir(t), ("Close",)), through) for t in pending)
+    try:
+        fetched = upstream.do(("batch", "ohlcv:" + ",".join(pending)), _download_many, pending, start, through)
+    except Exception as e:
+        print(f"[ERROR] OHLCV batch download failed for {len(pending)} tickers: {e}")
+        fetched = {}
+    _stats["batch_downloads"] += 1
+
+    failed = []
+    for ticker_symbol in pending:
+        bars = fetched.get(ticker_symbol)
+        try:
+            # Missing from the reply: left unsynced, so the next history() call retries it on its own
+            added = upstream.do(("ohlcv", ticker_symbol), _sync, ticker_symbol, through, bars) if bars is not None else None
+        except Exception as e:
+            added = None
+            print(f"[ERROR] OHLCV sync failed for {ticker_symbol}: {e}")
+        if added is None:
+            failed.append(ticker_symbol)
+        _record_sync(ticker_symbol, through, added)
+    return failed
+
+
+def synced_through(ticker_symbol):
+    """The session this process last synced `ticker_symbol` through, or None if it has not synced it yet."""
+    return _synced.get(ticker_symbol)
+
+
+def history(ticker_symbol, bars=None, start=None, columns=COLUMNS) -> pd.DataFrame:
+    """
+    Stored daily bars for a Yahoo ticker, synced first if needed: the last
+    `bars` rows, or the rows dated on or after `start`. Indexed by date, with
+    the requested columns (default all of OHLCV). Empty if nothing is available.
+    """
+    sync(ticker_symbol)
+    stored = _read(_ticker_dir(ticker_symbol), columns)
+    _stats["reads"] += 1
+    first = 0
+    if start is not None:
+        first = int(np.searchsorted(stored["Date"], (start - EPOCH).days))
+    if bars is not None:
+        first = max(first, len(stored["Date"]) - bars)
+    index = pd.DatetimeIndex(stored["Date"][first:].astype("datetime64[D]"), name="Date")
+    return pd.DataFrame({column: stored[column][first:] for column in columns}, index=index)
+
+
+def stats() -> dict:
+    tickers = os.listdir(STORE_DIR) if os.path.isdir(STORE_DIR) else []
+    return {"tickers": len(tickers), "synced_through": last_final_session().isoformat(), **_stats}
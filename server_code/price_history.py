@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import ohlcv_store
+
+# ---------------- Price history engine ---------------- #
+# Every price-series route reads closes through closes(): bars come from the
+# local OHLCV store (one fetch/cache path), NaN gaps are forward-filled, daily
+# bars can be resampled to weekly, and the result is cut to the last N
+# points. Routes only choose the projection (points(), last_closes()), and
+# all formatting is done on whole columns rather than row by row.
+FREQUENCIES = ("daily", "weekly")
+FORMATS = ("rows", "columnar")  # rows: the routes' list-of-dicts shapes (default)
+
+
+def weekly_last(series: pd.Series) -> pd.Series:
+    """
+    Daily -> weekly: the last session of each Saturday-Friday week, labelled
+    with that session's date. Days since 1970-01-01 (a Thursday) minus 2,
+    floor-divided by 7, numbers the weeks, so no resampler is needed.
+    """
+    days = series.index.values.astype("datetime64[D]").astype(np.int64)
+    week = (days - 2) // 7
+    last = np.append(week[1:] != week[:-1], True) if len(week) else np.zeros(0, dtype=bool)
+    return series[last]
+
+
+def closes(ticker_symbol, bars=None, start=None, frequency="daily") -> pd.Series:
+    """Close series indexed by session date; the last `bars` points and/or those on or after `start`."""
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency '{frequency}'. Use daily or weekly.")
+    weekly = frequency == "weekly"
+    if weekly and bars is not None and start is None:
+        start = date.today() - timedelta(weeks=bars + 1)
+    frame = ohlcv_store.history(ticker_symbol, bars=None if weekly else bars, start=start, columns=("Close",))
+    series = frame["Close"]
+    if series.hasnans:
+        series = series.ffill().dropna()
+    if weekly:
+        series = weekly_last(series)
+    return series.tail(bars) if bars is not None else series
+
+
+def pad_front(values, n) -> np.ndarray | None:
+    """The last n values, front-filled with the oldest one when there are fewer; None if empty."""
+    values = np.asarray(values, dtype=np.float64)[-n:]
+    if not len(values):
+        return None
+    return np.concatenate([np.full(n - len(values), values[0]), values])
+
+
+def last_closes(ticker_symbol, n, pad=False) -> list[float]:
+    """The last n closes as floats, front-padded to exactly n when `pad` is set."""
+    values = closes(ticker_symbol, bars=n).to_numpy()
+    if pad:
+        values = pad_front(values, n)
+        return values.tolist() if values is not None else []
+    return values.tolist()
+
+
+def columnar(series: pd.Series, decimals=2) -> dict:
+    """{"dates": ["2025-01-31", ...], "close": [...]}: ISO dates via numpy, closes rounded as one array."""
+    return {
+        "dates": np.datetime_as_string(series.index.values.astype("datetime64[D]"), unit="D").tolist(),
+        "close": np.round(series.to_numpy(dtype=np.float64), decimals).tolist(),
+    }
+
+
+def parse_format(value) -> str:
+    """"rows" (default) or "columnar"; raises ValueError otherwise."""
+    value = (value or "rows").strip().lower()
+    if value not in FORMATS:
+        raise ValueError(f"'format' must be one of {', '.join(FORMATS)}.")
+    return value
+
+
+def points(series: pd.Series, **columns) -> list[dict]:
+    """
+    One dict per point of `series`, built column-wise. Each keyword names an
+    output field and maps to a date format ("%Y-%m-%d"), or to a callable
+    applied to the whole close array (e.g. rounding).
+    """
+    fields = {}
+    for field, spec in columns.items():
+        if callable(spec):
+            fields[field] = list(spec(series.to_numpy()))
+        else:
+            fields[field] = list(series.index.strftime(spec))
+    names = list(fields)
+    return [dict(zip(names, row)) for row in zip(*fields.values())]
@@ -0,0 +1,79 @@
+import threading
+import time
+from datetime import datetime, timedelta, time as dt_time
+
+# ---------------- Quote cache ---------------- #
+# Live quotes come from yfinance and take seconds per call. A quote fetched
+# while the market is open is reused for OPEN_TTL seconds; one fetched while
+# it is closed cannot change before the next session, so it is kept until
+# the next open (9:15 on the next weekday; exchange holidays are not known here).
+OPEN_TTL = 15  # seconds
+MARKET_OPEN = dt_time(9, 15)
+
+
+def next_market_open(now=None) -> datetime:
+    """The next weekday 9:15 strictly after `now`."""
+    now = now or datetime.now()
+    candidate = datetime.combine(now.date(), MARKET_OPEN)
+    if now >= candidate:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:  # Sat, Sun
+        candidate += timedelta(days=1)
+    return candidate
+
+
+class QuoteCache:
+    """Thread-safe symbol -> quote cache with market-hours-aware expiry."""
+
+    def __init__(self, open_ttl=OPEN_TTL):
+        self.open_ttl = open_ttl
+        self._entries = {}  # key -> {"value", "fetched_at", "expires_at"}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key):
+        """The cached entry for `key` if it is still fresh, else None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] > now:
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value, market_open: bool) -> dict:
+        now = time.time()
+        if market_open:
+            expires_at = now + self.open_ttl
+        else:
+            expires_at = next_market_open(datetime.fromtimestamp(now)).timestamp()
+        entry = {"value": value, "fetched_at": now, "expires_at": expires_at}
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "open_ttl": self.open_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+def describe_age(entry) -> dict:
+    """`as_of` and `cache_age` (seconds) fields for a response built from `entry`."""
+    return {
+        "as_of": datetime.fromtimestamp(entry["fetched_at"]).strftime('%Y-%m-%d %H:%M:%S'),
+        "cache_age": round(time.time() - entry["fetched_at"], 1),
+    }
@@ -0,0 +1,329 @@
+import sys
+import heapq
+import string
+from collections import Counter, defaultdict
+
+import numpy as np
+from fuzzywuzzy import fuzz, process, utils
+
+# ---------------- Fuzzy search index ---------------- #
+# process.extract() runs full_process + WRatio on every choice for every query.
+# FuzzyIndex processes the choices once and keeps, per choice, character counts,
+# lengths, the strings as byte arrays and a token -> positions inverted index.
+# From those it computes a cheap upper bound on WRatio for every choice at once
+# (numpy), then scores choices with the real WRatio in descending bound order
+# and stops as soon as no remaining bound can reach the current top results.
+#
+# Scores are produced by the same WRatio call process.extract() makes, and the
+# bound never underestimates, so results (including tie order) are identical to
+# process.extract / process.extractOne; only the number of WRatio calls drops.
+_ALPHABET = string.ascii_lowercase + string.digits
+_CHAR_COLUMN = {ch: i for i, ch in enumerate(_ALPHABET)}
+_OTHER_COLUMN = len(_ALPHABET)  # "_" and anything else full_process keeps
+
+# 0, 1, 2, ... shared by every _Windows instance, grown on demand
+_positions = np.arange(0, dtype=np.int32)
+
+
+def _arange(size) -> np.ndarray:
+    global _positions
+    if len(_positions) < size:
+        _positions = np.arange(max(size, 2 * len(_positions)), dtype=np.int32)
+    return _positions[:size]
+
+
+def _process(text) -> str:
+    """Same preprocessing process.extract() applies with the default processor and scorer."""
+    return utils.full_process(utils.full_process(text), force_ascii=True)
+
+
+def _features(processed: str):
+    """Character counts and the lengths WRatio's sub-scores work on."""
+    counts = [0] * (len(_ALPHABET) + 1)
+    for ch in processed:
+        if ch != " ":
+            counts[_CHAR_COLUMN.get(ch, _OTHER_COLUMN)] += 1
+    tokens = processed.split()
+    unique = set(tokens)
+    non_space = sum(counts)
+    return (
+        counts,
+        tokens,
+        len(processed),                                    # ratio / partial_ratio
+        processed.count(" "),
+        len(tokens),
+        non_space + len(tokens) - 1,                       # token_sort strings
+        len(unique),
+        sum(len(t) for t in unique) + len(unique) - 1,     # token_set strings (no shared token)
+    )
+
+
+def _ratio_bound(matched, len1, len2):
+    """Upper bound for ratio() when at most `matched` characters can line up."""
+    matched = np.minimum(matched, np.minimum(len1, len2))
+    return 2.0 * matched / (len1 + len2)
+
+
+def _partial_bound(matched, shorter):
+    """Upper bound for partial_ratio(); the best window may be cut short at the end of the longer string."""
+    matched = np.minimum(matched, shorter)
+    return 2.0 * matched / (shorter + matched)
+
+
+def _reusing_process(previous):
+    """Interned _process(), answered from `previous` index's choices where it had them."""
+    known = dict(zip(previous.choices, previous.processed)) if previous is not None else {}
+
+    def process_choice(choice):
+        processed = known.get(choice)
+        return processed if processed is not None else sys.intern(_process(choice))
+    return process_choice
+
+
+class _Windows:
+    """
+    All choices concatenated as bytes, for bounding partial_ratio().
+    partial_ratio compares the shorter string against windows of the longer one,
+    so the best window's character overlap bounds the score far tighter than the
+    whole string's.
+    """
+
+    def __init__(self, texts):
+        self.offsets = np.zeros(len(texts), dtype=np.int64)
+        pos = 0
+        for i, text in enumerate(texts):
+            self.offsets[i] = pos
+            pos += len(text)
+        # One trailing sentinel byte keeps reduceat() in range for empty strings
+        self.codes = np.frombuffer(("".join(texts) + "\0").encode("ascii"), dtype=np.uint8)
+        self.segment_end = np.repeat(
+            np.append(self.offsets[1:], pos).astype(np.int32), [len(t) for t in texts]
+        )
+        self.segment_end = np.append(self.segment_end, pos + 1).astype(np.int32)
+
+    def bound(self, query: str) -> np.ndarray:
+        """Per choice: max over windows of 2*overlap / (len(query) + len(window))."""
+        size = len(query)
+        total = len(self.codes)
+        positions = _arange(total)
+        end = np.minimum(positions + size, self.segment_end)
+        matched = np.zeros(total, dtype=np.int32)
+        cumulative = np.zeros(total + 1, dtype=np.int32)
+        for ch, count in Counter(query).items():
+            np.cumsum(self.codes == ord(ch), out=cumulative[1:])
+            matched += np.minimum(cumulative[end] - cumulative[:total], count)
+        best = matched / (size + end - positions).astype(np.float32)
+        return 2.0 * np.maximum.reduceat(best, self.offsets)
+
+
+class FuzzyIndex:
+    """Exact, pruned replacement for process.extract / process.extractOne over a fixed list."""
+
+    def __init__(self, choices, cache=None, cache_key=None, previous=None):
+        """
+        `cache`: optional LRUCache shared by several indexes; results are stored under
+        (cache_key, method, processed query, arguments). `cache_key` must change whenever
+        the choices do - SymbolSnapshot uses (version, index name).
+        `previous`: an index over an older version of the list. Preprocessing and
+        per-choice features are copied from it for choices it already had, so a
+        refresh that adds or removes a few rows only does the per-string work for those.
+        """
+        self.choices = list(choices)
+        self.cache = cache
+        self.cache_key = cache_key
+        # Interned: indexes over the same names share one copy of each processed string
+        process_choice = _reusing_process(previous)
+        self.processed = [process_choice(choice) for choice in self.choices]
+        self.reused = 0
+
+        sorted_texts = [" ".join(sorted(text.split())) for text in self.processed]
+        set_texts = [" ".join(sorted(set(text.split()))) for text in self.processed]
+        self.plain_windows = _Windows(self.processed)
+        self.sorted_windows = _Windows(sorted_texts)
+        self.set_windows = _Windows(set_texts)
+
+        size = len(self.processed)
+        counts_matrix = np.zeros((size, len(_ALPHABET) + 1), dtype=np.int32)
+        lengths = np.zeros((6, size), dtype=np.int32)
+        fresh = range(size)
+        if isinstance(previous, FuzzyIndex) and not isinstance(previous, _FuzzyIndexView) and len(previous):
+            old_rows = {}
+            for pos, text in enumerate(previous.processed):
+                old_rows.setdefault(text, pos)
+            source = np.array([old_rows.get(text, -1) for text in self.processed], dtype=np.int64)
+            counts_matrix[:] = previous.counts[source]
+            lengths[:] = np.stack([previous.lengths, previous.spaces, previous.words,
+                                   previous.sorted_lengths, previous.unique_words, previous.set_lengths])[:, source]
+            fresh = np.flatnonzero(source < 0).tolist()
+            self.reused = size - len(fresh)
+        for pos in fresh:
+            counts, _, *sizes = _features(self.processed[pos])
+            counts_matrix[pos] = counts
+            lengths[:, pos] = sizes
+
+        postings = defaultdict(list)
+        for pos, text in enumerate(self.processed):
+            for token in set(text.split()):
+                postings[token].append(pos)
+
+        # Per-character counts fit in a byte for anything shorter than 256 characters
+        self.counts = counts_matrix.astype(np.min_scalar_type(int(counts_matrix.max(initial=0))))
+        (self.lengths, self.spaces, self.words,
+         self.sorted_lengths, self.unique_words, self.set_lengths) = lengths
+
+        # Inverted index in CSR form: token -> slot, slot -> positions[offsets[slot]:offsets[slot + 1]]
+        tokens = list(postings)
+        self.posting_slots = {sys.intern(token): slot for slot, token in enumerate(tokens)}
+        self.posting_offsets = np.zeros(len(tokens) + 1, dtype=np.int32)
+        np.cumsum([len(postings[token]) for token in tokens], out=self.posting_offsets[1:])
+        self.posting_positions = np.fromiter(
+            (pos for token in tokens for pos in postings[token]), dtype=np.int32, count=int(self.posting_offsets[-1])
+        )
+
+    @classmethod
+    def view(cls, source, order, choices, cache=None, cache_key=None, previous=None):
+        """
+        Index over `choices` that reuses `source`'s arrays, where choices[i] is
+        source.choices[order[i]] up to preprocessing (e.g. the same names in upper
+        case, or the second half of a names + symbols list). Builds a separate
+        index if any choice preprocesses differently, so results stay exact.
+        `previous` is the view this one replaces, used to skip re-checking unchanged choices.
+        """
+        order = np.asarray(order, dtype=np.int64)
+        processed = [source.processed[pos] for pos in order.tolist()]
+        process_choice = _reusing_process(previous)
+        if len(processed) != len(choices) or any(process_choice(c) != p for c, p in zip(choices, processed)):
+            return cls(choices, cache=cache, cache_key=cache_key, previous=previous)
+        return _FuzzyIndexView(source, order, list(choices), processed, cache, cache_key)
+
+    def __len__(self):
+        return len(self.choices)
+
+    def _upper_bounds(self, processed_query: str) -> np.ndarray:
+        """Upper bound of WRatio(query, choice) for every choice, on the 0-100 scale."""
+        counts, tokens, q_len, q_spaces, q_words, q_sorted, q_unique, q_set = _features(processed_query)
+
+        shared_token = np.zeros(len(self.choices), dtype=bool)
+        for token in set(tokens):
+            slot = self.posting_slots.get(token)
+            if slot is not None:
+                shared_token[self.posting_positions[self.posting_offsets[slot]:self.posting_offsets[slot + 1]]] = True
+
+        sorted_query = " ".join(sorted(tokens))
+        set_query = " ".join(sorted(set(tokens)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            windows = (
+                self.plain_windows.bound(processed_query),
+                self.sorted_windows.bound(sorted_query),
+                self.set_windows.bound(set_query),
+            )
+            bound = self._bound_from(counts, shared_token, windows, q_len, q_spaces, q_words, q_sorted, q_unique, q_set)
+        # Choices that process to an empty string always score 0
+        return np.where(self.lengths == 0, 0.0, bound)
+
+    def _bound_from(self, counts, shared_token, windows, q_len, q_spaces, q_words, q_sorted, q_unique, q_set):
+        common = np.minimum(self.counts, np.array(counts, dtype=np.int32)).sum(axis=1)
+        lengths = self.lengths
+        shorter = np.minimum(lengths, q_len)
+        longer = np.maximum(lengths, q_len)
+
+        base_matched = common + np.minimum(self.spaces, q_spaces)
+        sort_matched = common + np.minimum(self.words, q_words) - 1
+        set_matched = common + np.minimum(self.unique_words, q_unique) - 1
+
+        base = _ratio_bound(base_matched, lengths, q_len)
+
+        # Mirrors WRatio: partial scorers when one string is 1.5x longer, token scorers otherwise
+        len_ratio = longer / shorter
+        partial_scale = np.where(len_ratio > 8, 0.6, 0.9)
+        # Window bounds hold when the query is the shorter side (windows slide over the choice)
+        plain_window, sorted_window, set_window = windows
+        partial = np.maximum.reduce([
+            np.where(lengths >= q_len, plain_window,
+                     _partial_bound(base_matched, shorter)),
+            0.95 * np.where(self.sorted_lengths >= q_sorted, sorted_window,
+                            _partial_bound(sort_matched, np.minimum(self.sorted_lengths, q_sorted))),
+            0.95 * np.where(shared_token, 1.0,
+                            np.where(self.set_lengths >= q_set, set_window,
+                                     _partial_bound(set_matched, np.minimum(self.set_lengths, q_set)))),
+        ]) * partial_scale
+        token = 0.95 * np.maximum(
+            _ratio_bound(sort_matched, self.sorted_lengths, q_sorted),
+            np.where(shared_token, 1.0, _ratio_bound(set_matched, self.set_lengths, q_set)),
+        )
+
+        return 100.0 * np.maximum(base, np.where(len_ratio >= 1.5, partial, token))
+
+    def _search(self, processed_query: str, limit: int, score_cutoff=0) -> list:
+        """Top `limit` (score, position) pairs, ordered like heapq.nlargest over the full list."""
+        bounds = self._upper_bounds(processed_query)
+        # Highest bound first; position breaks ties so earlier choices are scored first
+        order = np.lexsort((np.arange(len(bounds)), -bounds))
+
+        top = []  # min-heap of (score, -position)
+        for pos in order.tolist():
+            if len(top) == limit and bounds[pos] < top[0][0] - 1:
+                break  # WRatio rounds, so allow one point of slack
+            if bounds[pos] < score_cutoff - 1:
+                break
+            score = fuzz.WRatio(processed_query, self.processed[pos], full_process=False)
+            if score < score_cutoff:
+                continue
+            item = (score, -pos)
+            if len(top) < limit:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+
+        return [(score, -neg_pos) for score, neg_pos in sorted(top, reverse=True)]
+
+    def _cached_search(self, processed_query: str, limit: int, score_cutoff=0) -> list:
+        """_search() through the shared result cache, when one is attached."""
+        if self.cache is None:
+            return self._search(processed_query, limit, score_cutoff)
+        key = (self.cache_key, processed_query, limit, score_cutoff)
+        found, result = self.cache.get(key)
+        if not found:
+            result = tuple(self._search(processed_query, limit, score_cutoff))
+            self.cache.put(key, result)
+        return list(result)
+
+    def extract(self, query, limit=5) -> list:
+        """Drop-in for process.extract(query, choices, limit=limit)."""
+        processed_query = _process(query)
+        if not processed_query or not self.choices:
+            return process.extract(query, self.choices, limit=limit)
+        return [(self.choices[pos], score) for score, pos in self._cached_search(processed_query, limit)]
+
+    def extract_bests(self, query, score_cutoff=0, limit=5) -> list:
+        """Drop-in for process.extractBests(query, choices, score_cutoff=score_cutoff, limit=limit)."""
+        processed_query = _process(query)
+        if not processed_query or not self.choices:
+            return process.extractBests(query, self.choices, score_cutoff=score_cutoff, limit=limit)
+        return [(self.choices[pos], score) for score, pos in self._cached_search(processed_query, limit, score_cutoff)]
+
+    def extract_one(self, query, score_cutoff=0):
+        """Drop-in for process.extractOne(query, choices, score_cutoff=score_cutoff)."""
+        processed_query = _process(query)
+        if not processed_query or not self.choices:
+            return process.extractOne(query, self.choices, score_cutoff=score_cutoff)
+        best = self._cached_search(processed_query, 1, score_cutoff)
+        if not best:
+            return None
+        score, pos = best[0]
+        return self.choices[pos], score
+
+
+class _FuzzyIndexView(FuzzyIndex):
+    """A reordered subset of another FuzzyIndex; bounds are computed on the source and gathered."""
+
+    def __init__(self, source, order, choices, processed, cache=None, cache_key=None):
+        self.source = source
+        self.order = order
+        self.choices = choices
+        self.processed = processed
+        self.cache = cache
+        self.cache_key = cache_key
+
+    def _upper_bounds(self, processed_query: str) -> np.ndarray:
+        return self.source._upper_bounds(processed_query)[self.order]
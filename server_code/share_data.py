@@ -1,18 +1,40 @@
-import pandas as pd
-import requests
-from io import BytesIO
-from fuzzywuzzy import process
-
-# Set headers for NSE data fetch
-HEADERS = {'User-Agent': 'Mozilla/5.0'}
-DATA_URL = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
-def load_symbol_data():
-    """
-    Load NSE symbol data CSV from official source and return as DataFrame.
-    """
-    response = requests.get(DATA_URL, headers=HEADERS)
-    df = pd.read_csv(BytesIO(response.content))
-    return df
+import os
+import math
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import symbol_master
+import index_catalog
+from symbol_master import load_symbol_data, get_snapshot
+
+# Batches at least this large are scored on a process pool, one worker per core
+# (MATCH_WORKERS overrides the count; 1 keeps every batch in-process). Workers
+# are spawned, not forked: a fork of this multi-threaded server could inherit
+# a lock held by another thread and hang.
+PARALLEL_BATCH_SIZE = 64
+MATCH_WORKERS = int(os.environ.get("MATCH_WORKERS", os.cpu_count() or 1))
+MAX_BATCH_SIZE = 1000
+
+def _company_matches(snapshot, query, limit=10):
+    """Companies whose name or symbol scores >= 60 against `query`, best first."""
+    matches = snapshot.name_symbol_index.extract_bests(query, score_cutoff=60, limit=limit)
+
+    results = []
+    seen = set()
+    for text, score in matches:
+        for pos in snapshot.positions_for(text):
+            company, symbol = snapshot.names[pos], snapshot.symbols[pos]
+            if (company, symbol) not in seen:
+                results.append({
+                    "company": company,
+                    "symbol": symbol,
+                    "score": score
+                })
+                seen.add((company, symbol))
+    return results
+
 def match_company(query, choice=None):
     """
     Match a query string to NSE company names or symbols.
@@ -28,25 +50,7 @@ def match_company(query, choice=None):
     if not query:
         raise ValueError("Missing 'query' parameter.")
 
-    df = load_symbol_data()
-    combined = df['NAME OF COMPANY'].tolist() + df['SYMBOL'].tolist()
-    matches = process.extract(query, combined, limit=10)
-
-    results = []
-    seen = set()
-    for text, score in matches:
-        if score < 60:
-            continue
-        rows = df[(df['NAME OF COMPANY'] == text) | (df['SYMBOL'] == text)]
-        for _, row in rows.iterrows():
-            company, symbol = row['NAME OF COMPANY'], row['SYMBOL']
-            if (company, symbol) not in seen:
-                results.append({
-                    "company": company,
-                    "symbol": symbol,
-                    "score": score
-                })
-                seen.add((company, symbol))
+    results = _company_matches(get_snapshot(), query)
 
     if not results:
         return []
@@ -59,28 +63,109 @@ def match_company(query, choice=None):
 
     return results
 
+####################################BATCH-MATCHING########################################
+
+_pool = None
+_pool_version = None
+_pool_lock = threading.Lock()
+_worker_snapshot = None
+
+def _init_worker(records, version):
+    """Load the corpus once per worker process."""
+    global _worker_snapshot
+    current = symbol_master._snapshot
+    if current is not None and current.version == version:
+        _worker_snapshot = current
+    else:
+        _worker_snapshot = symbol_master.SymbolSnapshot(records, version, "worker")
+
+def _resolve_one(snapshot, query, alternatives):
+    normalized = str(query).strip().upper()
+    results = _company_matches(snapshot, normalized, limit=alternatives + 1) if normalized else []
+    best = results[0] if results else None
+    return {
+        "query": query,
+        "match": {"company": best["company"], "symbol": best["symbol"]} if best else None,
+        "score": best["score"] if best else None,
+        "alternatives": results[1:alternatives + 1],
+    }
+
+def _resolve_chunk(queries, alternatives):
+    return [_resolve_one(_worker_snapshot, query, alternatives) for query in queries]
+
+def _get_pool(snapshot):
+    """One pool per symbol master version; replaced when the master refreshes."""
+    global _pool, _pool_version
+    with _pool_lock:
+        if _pool is None or _pool_version != snapshot.version:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=MATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(snapshot.records, snapshot.version),
+            )
+            _pool_version = snapshot.version
+        return _pool
+
+def _shutdown_pool():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+
+def _discard_pool(pool):
+    """Drop a broken pool so the next large batch starts a fresh one."""
+    global _pool, _pool_version
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            _pool_version = None
+    pool.shutdown(wait=False)
+
+atexit.register(_shutdown_pool)
+
+def match_companies(queries, alternatives=3):
+    """
+    Resolve many free-text names to NSE symbols in one call.
+    Returns one entry per query, in order: best match, its score and up to
+    `alternatives` other matches (all with score >= 60).
+    """
+    snapshot = get_snapshot()
+    if len(queries) < PARALLEL_BATCH_SIZE or MATCH_WORKERS <= 1:
+        return [_resolve_one(snapshot, query, alternatives) for query in queries]
+
+    chunk_size = math.ceil(len(queries) / (MATCH_WORKERS * 4))
+    chunks = [queries[i:i + chunk_size] for i in range(0, len(queries), chunk_size)]
+    pool = _get_pool(snapshot)
+    try:
+        results = []
+        for chunk_results in pool.map(_resolve_chunk, chunks, [alternatives] * len(chunks)):
+            results.extend(chunk_results)
+        return results
+    except BrokenProcessPool as e:
+        print(f"[WARN] Batch match pool broke ({e}); matching in-process and restarting the pool")
+        _discard_pool(pool)
+        return [_resolve_one(snapshot, query, alternatives) for query in queries]
+
 ####################################INDEX-POLLING########################################
 
-file_path = r"C:\Users\Admin\Desktop\rangmahal (2)\MarketSutra\server_code\index_symbols_df.pkl"
 def load_index_data():
-    """Load NSE equity symbol data."""
-    response = pd.read_pickle(file_path)
-    return response
+    """The shared index table (INDEX_NAME, SYMBOL) from the catalog. Callers must not mutate it."""
+    return index_catalog.index_table()
 def match_index(query, choice=None):
     query = query.strip().upper()
     if not query:
         raise ValueError("Missing 'query' parameter.")
-    df = load_index_data()
-    combined = df['INDEX_NAME'].tolist() + df['SYMBOL'].tolist()
-    matches = process.extract(query, combined, limit=10)
+    snapshot = get_snapshot()
+    matches = snapshot.index_name_symbol_index.extract_bests(query, score_cutoff=60, limit=10)
     results = []
     seen = set()
     for text, score in matches:
         if score < 60:
             continue
-        rows = df[(df['INDEX_NAME'] == text) | (df['SYMBOL'] == text)]
-        for _, row in rows.iterrows():
-            company, symbol = row['NAME OF COMPANY'], row['SYMBOL']
+        for pos in snapshot.index_positions_for(text):
+            company, symbol = snapshot.index_names[pos], snapshot.index_exchanges[pos]
             if (company, symbol) not in seen:
                 results.append({
                     "company": company,
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------- Single-flight upstream calls ---------------- #
+# When a stock trends, many requests ask yfinance / Google Finance for the same
+# symbol at once. upstream.do(key, fn) runs fn for the first caller only; every
+# caller that arrives while that call is in flight waits for it and gets the
+# same result (or the same exception). Keys are (kind, identifier) tuples,
+# e.g. ("quote", "RELIANCE.NS"). Counters are kept per kind, and per key for
+# the MAX_KEYS most recently used keys. Kinds whose identifiers are one-off
+# (a batch key joins a whole ticker set) are only counted per kind.
+TOP_KEYS = 20  # keys listed in stats(), most coalesced first
+MAX_KEYS = 500  # per-key counters kept, least recently used dropped first
+KIND_ONLY = {"batch"}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}   # key -> in-flight _Call
+        self._kinds = {}  # kind -> counters
+        self._metrics = OrderedDict()  # key -> counters, least recently used first
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per key at a time; concurrent callers share its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            started = time.perf_counter()
+            call.done.wait()
+            self._record(key, waited=time.perf_counter() - started)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        started = time.perf_counter()
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            self._record(key, fetch_time=time.perf_counter() - started)
+
+    @staticmethod
+    def _new_metrics():
+        return {"fetches": 0, "coalesced": 0, "fetch_ms_total": 0.0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+
+    def _record(self, key, waited=None, fetch_time=None):
+        kind = key[0]
+        with self._lock:
+            totals = self._kinds.get(kind)
+            if totals is None:
+                totals = self._kinds[kind] = self._new_metrics()
+            targets = [totals]
+            if kind not in KIND_ONLY:
+                metrics = self._metrics.get(key)
+                if metrics is None:
+                    metrics = self._metrics[key] = self._new_metrics()
+                    while len(self._metrics) > MAX_KEYS:
+                        self._metrics.popitem(last=False)
+                else:
+                    self._metrics.move_to_end(key)
+                targets.append(metrics)
+            for metrics in targets:
+                if fetch_time is not None:
+                    metrics["fetches"] += 1
+                    metrics["fetch_ms_total"] += fetch_time * 1000
+                if waited is not None:
+                    waited_ms = waited * 1000
+                    metrics["coalesced"] += 1
+                    metrics["wait_ms_total"] += waited_ms
+                    metrics["wait_ms_max"] = max(metrics["wait_ms_max"], waited_ms)
+
+    def stats(self) -> dict:
+        """Totals per kind plus the most coalesced of the tracked keys."""
+        with self._lock:
+            in_flight = len(self._calls)
+            items = [(key, dict(metrics)) for key, metrics in self._metrics.items()]
+            by_kind = {
+                kind: {"fetches": metrics["fetches"], "coalesced": metrics["coalesced"], "wait_ms_total": round(metrics["wait_ms_total"], 1)}
+                for kind, metrics in self._kinds.items()
+            }
+
+        items.sort(key=lambda item: item[1]["coalesced"], reverse=True)
+        keys = []
+        for (kind, name), metrics in items[:TOP_KEYS]:
+            keys.append({
+                "kind": kind,
+                "key": name,
+                "fetches": metrics["fetches"],
+                "coalesced": metrics["coalesced"],
+                "avg_fetch_ms": round(metrics["fetch_ms_total"] / metrics["fetches"], 1) if metrics["fetches"] else None,
+                "avg_wait_ms": round(metrics["wait_ms_total"] / metrics["coalesced"], 1) if metrics["coalesced"] else None,
+                "max_wait_ms": round(metrics["wait_ms_max"], 1),
+            })
+        return {"in_flight": in_flight, "by_kind": by_kind, "keys_tracked": len(items), "keys": keys}
+
+
+upstream = SingleFlight()
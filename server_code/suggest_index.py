@@ -0,0 +1,161 @@
+import re
+import sys
+import time
+import heapq
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+# ---------------- Typeahead prefix index ---------------- #
+# Every normalized company name, each of its word tails ("TATA STEEL LTD",
+# "STEEL LTD", "LTD") and every symbol is stored in one sorted list, so the
+# entries for a prefix are a contiguous slice found with two bisects. Only
+# that slice is ranked. For one- and two-character prefixes the slice is most
+# of the corpus, so their ranked top SHORT_PREFIX_TOP is kept per index and
+# re-ranked at most every SHORT_PREFIX_TTL seconds to follow popularity.
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+# A refresh patches the previous index instead of rebuilding it: keys of removed
+# entries are dropped, keys of new entries are merged in, and dead slots are
+# compacted away by a full rebuild once they pass MAX_DEAD_FRACTION.
+MAX_DEAD_FRACTION = 0.25
+
+SHORT_PREFIX_LEN = 2  # prefixes up to this length are served from the ranked cache
+SHORT_PREFIX_TOP = 50  # entries kept per short prefix (the /suggest limit cap)
+SHORT_PREFIX_TTL = 60  # seconds a cached ranking may lag behind popularity
+
+# Popularity: holders in transactions.db at startup plus lookups since then
+_popularity = Counter()
+_popularity_lock = threading.Lock()
+
+
+def normalize(text) -> str:
+    """Upper-case and collapse everything that is not a letter or digit into single spaces."""
+    return _NON_ALNUM.sub(" ", str(text).upper()).strip()
+
+
+def record_hit(key, weight=1):
+    """Count one lookup of a symbol (or index name) towards its popularity."""
+    if not key:
+        return
+    with _popularity_lock:
+        _popularity[key] += weight
+
+
+def seed_popularity(counts):
+    with _popularity_lock:
+        _popularity.update(counts)
+
+
+def _entry_tuple(entry) -> tuple:
+    return (entry["name"], entry["symbol"], entry["type"], entry["key"])
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over equities and market indices."""
+
+    def __init__(self, entries):
+        """`entries`: list of dicts with "name", "symbol", "type" and the popularity "key"."""
+        # Stored as (name, symbol, type, key) tuples; keys are interned so shared
+        # word tails ("LTD", "LIMITED") and the snapshot's own strings are held once
+        self.entries = [_entry_tuple(entry) for entry in entries]
+        self.names = [sys.intern(normalize(entry[0])) for entry in self.entries]
+        self.dead = frozenset()  # ids of removed entries whose slots are kept until compaction
+        pairs = []
+        for entry_id in range(len(self.entries)):
+            pairs.extend(self._entry_keys(entry_id))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.entry_ids = [entry_id for _, entry_id in pairs]
+        self._short = {}  # short prefix -> (ranked_at, top entry ids)
+
+    def __len__(self):
+        return len(self.entries) - len(self.dead)
+
+    def _entry_keys(self, entry_id) -> list:
+        """(key, entry_id) pairs: the name, each of its word tails and, for equities, the symbol."""
+        _, symbol, entry_type, _ = self.entries[entry_id]
+        words = self.names[entry_id].split()
+        pairs = [(self.names[entry_id], entry_id)]
+        for i in range(1, len(words)):
+            pairs.append((sys.intern(" ".join(words[i:])), entry_id))
+        if entry_type == "equity":
+            pairs.append((sys.intern(normalize(symbol)), entry_id))
+        return pairs
+
+    def updated(self, entries):
+        """
+        Index for `entries` (same format as the constructor) built by patching this one.
+        Returns the new index and the number of entries added and removed.
+        """
+        wanted = Counter(_entry_tuple(entry) for entry in entries)
+        live = defaultdict(list)
+        for entry_id, entry in enumerate(self.entries):
+            if entry_id not in self.dead:
+                live[entry].append(entry_id)
+
+        removed = set()
+        for entry, entry_ids in live.items():
+            extra = len(entry_ids) - wanted.get(entry, 0)
+            if extra > 0:
+                removed.update(entry_ids[-extra:])
+        added = []
+        for entry, count in wanted.items():
+            added.extend([entry] * (count - len(live.get(entry, ()))))
+
+        dead = self.dead | removed
+        if len(dead) > MAX_DEAD_FRACTION * (len(self.entries) + len(added)):
+            return PrefixIndex(entries), len(added), len(removed)
+
+        index = PrefixIndex.__new__(PrefixIndex)
+        index.entries = self.entries + added
+        index.names = self.names + [sys.intern(normalize(entry[0])) for entry in added]
+        index.dead = frozenset(dead)
+        new_pairs = []
+        for entry_id in range(len(self.entries), len(index.entries)):
+            new_pairs.extend(index._entry_keys(entry_id))
+        new_pairs.sort()
+        kept = ((key, entry_id) for key, entry_id in zip(self.keys, self.entry_ids) if entry_id not in removed)
+        pairs = list(heapq.merge(kept, new_pairs))
+        index.keys = [key for key, _ in pairs]
+        index.entry_ids = [entry_id for _, entry_id in pairs]
+        index._short = {}
+        return index, len(added), len(removed)
+
+    def _rank(self, prefix, limit) -> list:
+        """Entry ids of the best `limit` matches for a normalized prefix."""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        candidates = set(self.entry_ids[lo:hi])
+
+        def rank(entry_id):
+            _, symbol, _, key = self.entries[entry_id]
+            name = self.names[entry_id]
+            return (
+                symbol != prefix,                     # exact symbol first
+                -_popularity.get(key, 0),             # then most popular
+                not name.startswith(prefix),          # whole-name matches before word matches
+                len(name),
+                name,
+            )
+
+        return heapq.nsmallest(limit, candidates, key=rank)
+
+    def search(self, prefix, limit=10) -> list:
+        """Top `limit` entries whose name, a word of the name, or symbol starts with `prefix`."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        if len(prefix) <= SHORT_PREFIX_LEN and limit <= SHORT_PREFIX_TOP:
+            now = time.monotonic()
+            cached = self._short.get(prefix)
+            if cached is None or now - cached[0] >= SHORT_PREFIX_TTL:
+                cached = self._short[prefix] = (now, self._rank(prefix, SHORT_PREFIX_TOP))
+            best = cached[1][:limit]
+        else:
+            best = self._rank(prefix, limit)
+        return [
+            {"name": self.entries[i][0], "symbol": self.entries[i][1], "type": self.entries[i][2]}
+            for i in best
+        ]
@@ -0,0 +1,553 @@
+import os
+import sys
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from io import BytesIO
+
+import requests
+import pandas as pd
+
+from search_index import FuzzyIndex
+from match_cache import match_cache
+from memory_report import deep_size, process_rss, megabytes
+from suggest_index import PrefixIndex
+import index_catalog
+
+# ---------------- Symbol master setup ---------------- #
+# The NSE equity list (EQUITY_L.csv) is loaded once per process, from the
+# local snapshot when one exists, and refreshed in the background with a
+# conditional GET. Every refresh builds a complete new snapshot and swaps the
+# reference under the lock, so a request never sees a half-built frame.
+# Index lookups come from index_catalog; when index_symbols_df.pkl is
+# reloaded, the next get_snapshot() rebuilds the snapshot from the same
+# equity records (incrementally, like a refresh) so /match_index and /suggest
+# pick up the new index list.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_URL = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+SNAPSHOT_PATH = os.path.join(BASE_DIR, "EQUITY_L.csv")
+SNAPSHOT_META_PATH = os.path.join(BASE_DIR, "EQUITY_L.meta.json")
+REFRESH_INTERVAL = 6 * 60 * 60  # seconds
+DIFF_HISTORY = 10  # row-level diffs kept for /symbols/diff
+FETCH_TIMEOUT = 15
+
+
+def _normalize_name(name) -> str:
+    return str(name).strip().upper()
+
+
+def _column(df, name):
+    """EQUITY_L.csv pads most headers with a leading space (" ISIN NUMBER")."""
+    for column in df.columns:
+        if column.strip() == name:
+            return df[column]
+    return None
+
+
+class SymbolRow:
+    """Lightweight view of one row of SymbolRecords."""
+    __slots__ = ("records", "pos")
+
+    def __init__(self, records, pos):
+        self.records = records
+        self.pos = pos
+
+    @property
+    def symbol(self):
+        return self.records.symbols[self.pos]
+
+    @property
+    def name(self):
+        return self.records.names[self.pos]
+
+    @property
+    def series(self):
+        return self.records.series[self.pos]
+
+    @property
+    def isin(self):
+        return self.records.isins[self.pos]
+
+    def to_dict(self) -> dict:
+        return {"symbol": self.symbol, "name": self.name, "series": self.series, "isin": self.isin}
+
+
+class SymbolRecords:
+    """
+    Column store for the fields the server uses (symbol, company name, series, ISIN).
+    Strings are interned, so values repeated across rows, snapshots and the
+    derived indexes ("EQ", names that are already upper case) are held once.
+    The parsed DataFrame is dropped after conversion.
+    """
+    __slots__ = ("symbols", "names", "series", "isins", "frame_bytes")
+
+    def __init__(self, symbols, names, series, isins, frame_bytes=None):
+        self.symbols = symbols
+        self.names = names
+        self.series = series
+        self.isins = isins
+        self.frame_bytes = frame_bytes  # footprint of the DataFrame this was built from
+
+    @classmethod
+    def from_frame(cls, df):
+        def strings(column):
+            if column is None:
+                return [None] * len(df)
+            return [None if pd.isna(value) else sys.intern(str(value).strip()) for value in column.tolist()]
+
+        return cls(
+            symbols=strings(df['SYMBOL']),
+            names=strings(df['NAME OF COMPANY']),
+            series=strings(_column(df, 'SERIES')),
+            isins=strings(_column(df, 'ISIN NUMBER')),
+            frame_bytes=int(df.memory_usage(deep=True).sum()),
+        )
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getstate__(self):
+        return (self.symbols, self.names, self.series, self.isins, self.frame_bytes)
+
+    def __setstate__(self, state):
+        self.symbols, self.names, self.series, self.isins, self.frame_bytes = state
+        # Re-intern after unpickling in a worker process
+        for column in (self.symbols, self.names, self.series, self.isins):
+            column[:] = [sys.intern(value) if value is not None else None for value in column]
+
+    def row(self, pos) -> SymbolRow:
+        return SymbolRow(self, pos)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'SYMBOL': self.symbols,
+            'NAME OF COMPANY': self.names,
+            'SERIES': pd.Categorical(self.series),
+            'ISIN NUMBER': self.isins,
+        })
+
+
+class SymbolSnapshot:
+    """One loaded version of the symbol master. Treat it as read-only."""
+
+    def __init__(self, records, version, source, etag=None, last_modified=None, previous=None):
+        """
+        `previous`: the snapshot this one replaces. When given, the derived indexes
+        are updated from it (per-string work only for added rows, prefix keys
+        patched in place) instead of being built from scratch.
+        """
+        self.records = records
+        self.version = version
+        self.source = source  # "disk" or "network"
+        self.etag = etag
+        self.last_modified = last_modified
+        self.loaded_at = time.time()
+
+        started = time.perf_counter()
+        # Row-aligned columns; a row is addressed by its position in these lists
+        self.names = records.names
+        self.names_upper = [sys.intern(_normalize_name(name)) for name in self.names]
+        self.symbols = records.symbols
+        self.isins = records.isins
+
+        # Hash lookups: symbol -> row, normalized name -> rows, ISIN -> row
+        self.by_symbol = {}
+        self.by_name = {}
+        self.by_isin = {}
+        for pos, (name, symbol, isin) in enumerate(zip(self.names_upper, self.symbols, self.isins)):
+            self.by_symbol.setdefault(symbol, pos)
+            self.by_name.setdefault(name, []).append(pos)
+            if isinstance(isin, str):
+                self.by_isin.setdefault(sys.intern(isin.strip().upper()), pos)
+
+        self.catalog_version = index_catalog.index_table_version()
+        index_df = index_catalog.index_table()
+        self.index_names = index_df['INDEX_NAME'].tolist()
+        self.index_exchanges = index_df['SYMBOL'].tolist()
+        self.index_by_text = {}
+        for pos, (index_name, exchange) in enumerate(zip(self.index_names, self.index_exchanges)):
+            self.index_by_text.setdefault(index_name, []).append(pos)
+            if exchange != index_name:
+                self.index_by_text.setdefault(exchange, []).append(pos)
+
+        # Fuzzy search indexes, one per choice list the routes match against.
+        # Results are memoized in match_cache under this snapshot's version.
+        # The name-only and symbols-then-names lists are views over names + symbols;
+        # symbols get their own small index so /price does not bound every name.
+        count = len(self.names)
+        self.build_mode = "incremental" if previous is not None else "full"
+        self.name_symbol_index = self._fuzzy_index("name_symbol", self.names + self.symbols, previous)
+        self.symbol_index = self._fuzzy_index("symbol", self.symbols, previous)
+        self.name_index = self._fuzzy_view("name", self.names_upper, range(count), previous)
+        self.symbol_name_index = self._fuzzy_view(
+            "symbol_name", self.symbols + self.names_upper, list(range(count, 2 * count)) + list(range(count)), previous
+        )
+        self.index_name_symbol_index = self._fuzzy_index("index_name_symbol", self.index_names + self.index_exchanges, previous)
+        if previous is not None:
+            self.prefix_index, _, _ = previous.prefix_index.updated(self._suggest_entries())
+        else:
+            self.prefix_index = PrefixIndex(self._suggest_entries())
+        self.index_build_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def row(self, pos) -> SymbolRow:
+        return self.records.row(pos)
+
+    def _fuzzy_index(self, name, choices, previous=None) -> FuzzyIndex:
+        return FuzzyIndex(choices, cache=match_cache, cache_key=(self.version, name),
+                          previous=getattr(previous, f"{name}_index", None))
+
+    def _fuzzy_view(self, name, choices, order, previous=None) -> FuzzyIndex:
+        return FuzzyIndex.view(self.name_symbol_index, list(order), choices,
+                               cache=match_cache, cache_key=(self.version, name),
+                               previous=getattr(previous, f"{name}_index", None))
+
+    def _suggest_entries(self) -> list:
+        """Typeahead entries: every equity plus the market indices from index_symbols_df.pkl."""
+        entries = [
+            {"name": name, "symbol": symbol, "type": "equity", "key": symbol}
+            for name, symbol in zip(self.names, self.symbols)
+        ]
+        for index_name, exchange in zip(self.index_names, self.index_exchanges):
+            entries.append({"name": index_name, "symbol": exchange, "type": "index", "key": index_name})
+        return entries
+
+    def positions_for(self, text) -> list:
+        """Rows whose symbol or (normalized) company name equals `text`, in file order."""
+        positions = list(self.by_name.get(_normalize_name(text), ()))
+        pos = self.by_symbol.get(text)
+        if pos is not None and pos not in positions:
+            positions.append(pos)
+            positions.sort()
+        return positions
+
+    def resolve(self, text):
+        """First row for a symbol or company name, or None."""
+        pos = self.by_symbol.get(text)
+        if pos is None:
+            rows = self.by_name.get(_normalize_name(text))
+            pos = rows[0] if rows else None
+        return pos
+
+    def position_for_isin(self, isin):
+        return self.by_isin.get(str(isin).strip().upper())
+
+    def index_positions_for(self, text) -> list:
+        """Index rows whose INDEX_NAME or SYMBOL equals `text`."""
+        return self.index_by_text.get(text, [])
+
+
+_snapshot = None
+_lock = threading.Lock()          # guards _snapshot swaps, _diffs and _stats (never held during a build)
+_refresh_lock = threading.Lock()  # only one load/refresh runs at a time
+_stop_event = threading.Event()
+_refresher_thread = None
+
+_diffs = deque(maxlen=DIFF_HISTORY)  # newest last; guarded by _lock
+
+_stats = {
+    "refresh_interval": REFRESH_INTERVAL,
+    "refresh_count": 0,
+    "last_refresh_at": None,
+    "last_refresh_ms": None,
+    "last_refresh_result": None,
+    "last_error": None,
+}
+
+
+# ---------------- Helper functions ---------------- #
+def _parse_csv(content: bytes) -> pd.DataFrame:
+    return pd.read_csv(BytesIO(content))
+
+
+def _read_meta() -> dict:
+    try:
+        with open(SNAPSHOT_META_PATH, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_snapshot(content: bytes, etag, last_modified):
+    """Write the CSV and its validators to disk, replacing the old files atomically."""
+    tmp_path = SNAPSHOT_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, SNAPSHOT_PATH)
+
+    tmp_meta = SNAPSHOT_META_PATH + ".tmp"
+    with open(tmp_meta, "w") as f:
+        json.dump({"etag": etag, "last_modified": last_modified}, f)
+    os.replace(tmp_meta, SNAPSHOT_META_PATH)
+
+
+def diff_records(old, new) -> dict:
+    """Row-level diff between two SymbolRecords, keyed on SYMBOL."""
+    old_rows = {symbol: pos for pos, symbol in enumerate(old.symbols)}
+    new_rows = {symbol: pos for pos, symbol in enumerate(new.symbols)}
+    added = [new.row(pos).to_dict() for symbol, pos in new_rows.items() if symbol not in old_rows]
+    removed = [old.row(pos).to_dict() for symbol, pos in old_rows.items() if symbol not in new_rows]
+    changed = []
+    for symbol, pos in new_rows.items():
+        old_pos = old_rows.get(symbol)
+        if old_pos is None:
+            continue
+        before, after = old.row(old_pos).to_dict(), new.row(pos).to_dict()
+        if before != after:
+            changed.append({"symbol": symbol, "before": before, "after": after})
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def _install(df, source, etag=None, last_modified=None):
+    """Swap in a new snapshot built from a parsed EQUITY_L frame and return it."""
+    return _install_records(SymbolRecords.from_frame(df), source, etag, last_modified)
+
+
+def _install_records(records, source, etag=None, last_modified=None):
+    """
+    Build a snapshot of `records` and swap it in; returns it. The build runs
+    outside _lock, so readers and get_status() are not blocked; callers hold
+    _refresh_lock, so only one build runs at a time.
+    """
+    global _snapshot
+    previous = _snapshot
+    version = previous.version + 1 if previous else 1
+    new_snapshot = SymbolSnapshot(records, version, source, etag, last_modified, previous=previous)
+    diff = diff_records(previous.records, records) if previous is not None and previous.records is not records else None
+    with _lock:
+        _snapshot = new_snapshot
+        if diff is not None:
+            _diffs.append({
+                "from_version": previous.version,
+                "to_version": version,
+                "at": time.time(),
+                "source": source,
+                "build_mode": new_snapshot.build_mode,
+                "index_build_ms": new_snapshot.index_build_ms,
+                "counts": {kind: len(rows) for kind, rows in diff.items()},
+                **diff,
+            })
+    if diff is not None:
+        print(f"[INFO] Symbol master v{version}: +{len(diff['added'])} -{len(diff['removed'])} "
+              f"~{len(diff['changed'])} rows, indexes updated in {new_snapshot.index_build_ms} ms")
+    elif previous is not None:
+        print(f"[INFO] Index catalog changed: symbol master v{version} rebuilt in {new_snapshot.index_build_ms} ms")
+    # Keys carry the version, so old entries can never be served; drop them to free the slots
+    match_cache.clear()
+    return new_snapshot
+
+
+def _rebuild_for_catalog():
+    """Rebuild the current snapshot's index lookups after index_symbols_df.pkl changed."""
+    # A refresh already running builds against the new catalog; keep serving meanwhile
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        current = _snapshot
+        if current.catalog_version != index_catalog.index_table_version():
+            _install_records(current.records, current.source, current.etag, current.last_modified)
+    except Exception as e:
+        print(f"[ERROR] Rebuilding symbol master for the index catalog failed: {e}")
+    finally:
+        _refresh_lock.release()
+
+
+def _load_from_disk():
+    if not os.path.exists(SNAPSHOT_PATH):
+        return None
+    with open(SNAPSHOT_PATH, "rb") as f:
+        df = _parse_csv(f.read())
+    meta = _read_meta()
+    return _install(df, "disk", meta.get("etag"), meta.get("last_modified"))
+
+
+def _record_refresh(result, started, error=None):
+    with _lock:
+        _stats["refresh_count"] += 1
+        _stats["last_refresh_at"] = time.time()
+        _stats["last_refresh_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        _stats["last_refresh_result"] = result
+        _stats["last_error"] = error
+
+
+# ---------------- Loading & refresh ---------------- #
+def refresh(force=False) -> str:
+    """
+    Re-download EQUITY_L.csv if it changed upstream.
+    Sends If-None-Match / If-Modified-Since unless `force` is set.
+    Returns "updated", "not_modified" or "failed".
+    """
+    with _refresh_lock:
+        return _download(force)
+
+
+def _download(force) -> str:
+    """refresh() with _refresh_lock already held."""
+    started = time.perf_counter()
+    current = _snapshot
+    headers = dict(HEADERS)
+    if current and not force:
+        if current.etag:
+            headers["If-None-Match"] = current.etag
+        if current.last_modified:
+            headers["If-Modified-Since"] = current.last_modified
+
+    try:
+        resp = requests.get(DATA_URL, headers=headers, timeout=FETCH_TIMEOUT)
+        if resp.status_code == 304:
+            _record_refresh("not_modified", started)
+            return "not_modified"
+        resp.raise_for_status()
+
+        df = _parse_csv(resp.content)
+        if df.empty or "SYMBOL" not in df.columns:
+            raise ValueError("Downloaded symbol list is empty or malformed")
+
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        _install(df, "network", etag, last_modified)
+        try:
+            _write_snapshot(resp.content, etag, last_modified)
+        except Exception as e:
+            print(f"[WARN] Could not write symbol snapshot: {e}")
+
+        _record_refresh("updated", started)
+        print(f"[INFO] Symbol master updated: {len(df)} rows")
+        return "updated"
+    except Exception as e:
+        _record_refresh("failed", started, str(e))
+        print(f"[ERROR] Symbol master refresh failed: {e}")
+        return "failed"
+
+
+def get_snapshot() -> SymbolSnapshot:
+    """Return the current snapshot, loading it on first use."""
+    current = _snapshot
+    if current is not None:
+        if current.catalog_version != index_catalog.index_table_version():
+            _rebuild_for_catalog()
+            return _snapshot
+        return current
+
+    # Concurrent first callers queue on the lock; the first one loads (or
+    # downloads) and the rest find _snapshot set when they get the lock.
+    with _refresh_lock:
+        if _snapshot is None:
+            try:
+                _load_from_disk()
+            except Exception as e:
+                print(f"[ERROR] Failed to read symbol snapshot: {e}")
+        if _snapshot is None:
+            _download(force=True)
+    if _snapshot is None:
+        raise RuntimeError("Symbol master is not available")
+    return _snapshot
+
+
+def load_symbol_data() -> pd.DataFrame:
+    """
+    The NSE equity list as a new DataFrame (SYMBOL, NAME OF COMPANY, SERIES, ISIN NUMBER).
+    Built on each call from the compact records; request paths should use the snapshot instead.
+    """
+    return get_snapshot().records.to_frame()
+
+
+# ---------------- Background refresher ---------------- #
+def _refresher_loop(interval):
+    while not _stop_event.wait(interval):
+        refresh()
+
+
+def start_refresher(interval=REFRESH_INTERVAL):
+    """Load the master (if needed) and start the background refresh thread once."""
+    global _refresher_thread
+    try:
+        current = get_snapshot()
+        # A snapshot read from disk may be stale; check upstream right away.
+        if current.source == "disk":
+            threading.Thread(target=refresh, daemon=True).start()
+    except Exception as e:
+        print(f"[ERROR] Symbol master not loaded at startup: {e}")
+
+    with _lock:
+        if _refresher_thread is not None and _refresher_thread.is_alive():
+            return
+        _stop_event.clear()
+        _stats["refresh_interval"] = interval
+        _refresher_thread = threading.Thread(
+            target=_refresher_loop, args=(interval,), name="symbol-master-refresh", daemon=True
+        )
+        _refresher_thread.start()
+
+
+def stop_refresher():
+    _stop_event.set()
+
+
+_MEMORY_COMPONENTS = (
+    ("records", ("records", "names_upper")),
+    ("lookups", ("by_symbol", "by_name", "by_isin", "index_names", "index_exchanges", "index_by_text")),
+    ("fuzzy_indexes", ("name_symbol_index", "symbol_index", "name_index", "symbol_name_index", "index_name_symbol_index")),
+    ("prefix_index", ("prefix_index",)),
+)
+
+
+def memory_report() -> dict:
+    """
+    Approximate footprint of the current snapshot in this worker process.
+    Shared objects are counted once, under the first component that reaches them.
+    """
+    current = get_snapshot()
+    seen = set()
+    components = {}
+    for label, attributes in _MEMORY_COMPONENTS:
+        components[label] = sum(deep_size(getattr(current, attribute), seen) for attribute in attributes)
+    return {
+        "pid": os.getpid(),
+        "version": current.version,
+        "rows": len(current.records),
+        "dataframe_mb": megabytes(current.records.frame_bytes),  # parsed EQUITY_L.csv frame, no longer kept
+        "components_mb": {label: megabytes(size) for label, size in components.items()},
+        "snapshot_mb": megabytes(sum(components.values())),
+        "rss_mb": megabytes(process_rss()),
+    }
+
+
+def get_diffs(limit=1) -> list:
+    """The most recent row-level diffs applied by refreshes, newest first."""
+    with _lock:
+        recent = list(_diffs)[::-1][:limit]
+    return [
+        {**diff, "at": datetime.fromtimestamp(diff["at"]).strftime('%Y-%m-%d %H:%M:%S')}
+        for diff in recent
+    ]
+
+
+def get_status() -> dict:
+    """Load age and refresh timing for the admin/status route."""
+    current = _snapshot
+    with _lock:
+        stats = dict(_stats)
+    if stats["last_refresh_at"]:
+        stats["last_refresh_at"] = datetime.fromtimestamp(stats["last_refresh_at"]).strftime('%Y-%m-%d %H:%M:%S')
+    stats["refresher_running"] = bool(_refresher_thread and _refresher_thread.is_alive())
+
+    if current is None:
+        return {"loaded": False, **stats}
+    return {
+        "loaded": True,
+        "version": current.version,
+        "source": current.source,
+        "rows": len(current.records),
+        "loaded_at": datetime.fromtimestamp(current.loaded_at).strftime('%Y-%m-%d %H:%M:%S'),
+        "age_seconds": round(time.time() - current.loaded_at, 1),
+        "index_build_ms": current.index_build_ms,
+        "build_mode": current.build_mode,
+        "catalog_version": current.catalog_version,
+        "etag": current.etag,
+        "last_modified": current.last_modified,
+        "match_cache": match_cache.stats(),
+        **stats,
+    }
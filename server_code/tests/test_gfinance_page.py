@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import gfinance_page
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "gfinance_quote.html")
+
+
+@pytest.fixture
+def page():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def soup_calls(monkeypatch):
+    """Count calls of the BeautifulSoup fallback."""
+    calls = []
+    soup = gfinance_page.extract_quote_soup
+
+    def counted(page):
+        calls.append(page)
+        return soup(page)
+
+    monkeypatch.setattr(gfinance_page, "extract_quote_soup", counted)
+    return calls
+
+
+def test_scanner_and_soup_agree_on_a_quote_page(page, soup_calls):
+    assert gfinance_page.extract_quote(page) == (24850.55, 24812.30)
+    assert soup_calls == []  # both fields found by the scanner
+    assert gfinance_page.extract_quote_soup(page) == (24850.55, 24812.30)
+    assert gfinance_page.extract_price(page) == 24850.55
+
+
+def test_missing_previous_close_falls_back_to_the_soup_parser(page, soup_calls):
+    # An extra class on the label: the scanner's exact-attribute search misses it, the tree parser does not
+    changed = page.replace('<div class="mfs7Fc">Previous close', '<div class="mfs7Fc wide">Previous close')
+    assert gfinance_page._scan_price(changed) == 24850.55
+    assert gfinance_page._scan_previous_close(changed) is None
+    assert gfinance_page.extract_quote(changed) == (24850.55, 24812.30)
+    assert len(soup_calls) == 1
+
+
+def test_missing_price_falls_back_to_the_soup_parser(page, soup_calls):
+    # Single-quoted attribute: same element for the tree parser, no marker for the scanner
+    changed = page.replace('<div class="YMlKec fxKbKc">', "<div class='YMlKec fxKbKc'>")
+    assert gfinance_page._scan_price(changed) is None
+    assert gfinance_page.extract_quote(changed) == (24850.55, 24812.30)
+    assert len(soup_calls) == 1
+
+
+def test_fields_missing_from_the_page_are_none(soup_calls):
+    assert gfinance_page.extract_quote("<html><body>Not found</body></html>") == (None, None)
+    assert len(soup_calls) == 1
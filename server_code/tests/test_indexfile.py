@@ -0,0 +1,54 @@
+import pytest
+
+import indexfile
+import tick_history
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    """Fresh price cache, tick rings and listeners."""
+    monkeypatch.setattr(indexfile, "cached_data", {"prices": {}, "status": "Loading...", "updated_at": None, "version": 0, "versions": {}})
+    monkeypatch.setattr(indexfile, "_ticks", {})
+    monkeypatch.setattr(indexfile, "_listeners", [])
+
+
+def _entry(price):
+    return {"price": price, "difference": 0.0, "direction": "↑", "previous_close": price}
+
+
+def _scrape(prices, at):
+    indexfile._store({name: _entry(price) for name, price in prices.items()}, indexfile.STATUS_OPEN, at)
+
+
+def test_since_current_version_returns_no_changes():
+    _scrape({"NIFTY_50": 100.0, "SENSEX": 200.0}, 1000.0)
+    _scrape({"NIFTY_50": 101.0, "SENSEX": 200.0}, 1060.0)
+    current = indexfile.get_cached_prices()["version"]
+    data = indexfile.get_cached_prices(since=current)
+    assert data["version"] == current
+    assert data["prices"] == {}
+
+
+def test_stale_since_returns_only_indexes_changed_after_it():
+    _scrape({"NIFTY_50": 100.0, "SENSEX": 200.0, "NIFTY_BANK": 300.0}, 1000.0)
+    first = indexfile.get_cached_prices()["version"]
+    _scrape({"NIFTY_50": 101.0, "SENSEX": 200.0, "NIFTY_BANK": 300.0}, 1060.0)
+    _scrape({"NIFTY_50": 101.0, "SENSEX": 200.0, "NIFTY_BANK": 301.0}, 1120.0)
+
+    assert set(indexfile.get_cached_prices(since=first)["prices"]) == {"NIFTY_50", "NIFTY_BANK"}
+    assert set(indexfile.get_cached_prices(since=first + 1)["prices"]) == {"NIFTY_BANK"}
+    assert set(indexfile.get_cached_prices(since=0)["prices"]) == {"NIFTY_50", "SENSEX", "NIFTY_BANK"}
+    # A version from before a restart (ahead of ours) gets everything
+    assert set(indexfile.get_cached_prices(since=first + 100)["prices"]) == {"NIFTY_50", "SENSEX", "NIFTY_BANK"}
+
+
+def test_ticks_are_capped_by_the_ring_size():
+    capacity = tick_history.CAPACITY
+    for i in range(capacity + 25):
+        _scrape({"NIFTY_50": 100.0 + i}, 1000.0 + 60 * i)
+
+    ticks = indexfile.get_cached_prices(ticks=capacity * 2)["ticks"]["NIFTY_50"]
+    assert len(ticks["p"]) == len(ticks["t"]) == capacity
+    assert ticks["p"][0] == 100.0 + 25  # the oldest ticks were overwritten
+    assert ticks["p"][-1] == 100.0 + capacity + 24
+    assert indexfile.get_cached_prices(ticks=10)["ticks"]["NIFTY_50"]["p"] == ticks["p"][-10:]
@@ -0,0 +1,65 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+import ohlcv_store
+
+TICKER = "TEST.NS"
+SESSIONS = pd.bdate_range("2023-01-02", "2024-06-28")
+CLOSES = 1000 + np.cumsum(np.random.default_rng(3).normal(0, 8, len(SESSIONS)))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Empty OHLCV store whose downloader serves SESSIONS, and a settable 'last final session'."""
+    downloads = []
+    clock = {"session": None}
+
+    def download(ticker_symbol, start, end):
+        downloads.append((start, end))
+        keep = (SESSIONS.date >= start) & (SESSIONS.date <= end)
+        if not keep.any():
+            return None
+        bars = {"Date": SESSIONS[keep].values.astype("datetime64[D]").astype(np.int64)}
+        for column in ohlcv_store.COLUMNS:
+            bars[column] = CLOSES[keep].copy()
+        return bars
+
+    monkeypatch.setattr(ohlcv_store, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(ohlcv_store, "_synced", {})
+    monkeypatch.setattr(ohlcv_store, "_download", download)
+    monkeypatch.setattr(ohlcv_store, "last_final_session", lambda now=None: clock["session"])
+    monkeypatch.setattr(indicators, "_states", type(indicators._states)())
+    return clock, downloads
+
+
+def test_as_of_advances_when_a_new_session_is_final(store):
+    clock, downloads = store
+    clock["session"] = date(2024, 6, 4)
+    assert indicators.get_indicators(TICKER)["as_of"] == "2024-06-04"
+    assert indicators.get_indicators(TICKER)["as_of"] == "2024-06-04"
+    assert len(downloads) == 1  # second call served from the cached state
+
+    clock["session"] = date(2024, 6, 5)
+    assert indicators.get_indicators(TICKER)["as_of"] == "2024-06-05"
+
+    clock["session"] = date(2024, 6, 12)
+    values = indicators.get_indicators(TICKER)
+    assert values["as_of"] == "2024-06-12"
+    assert len(downloads) == 3
+
+    last = int(np.flatnonzero(SESSIONS.date <= date(2024, 6, 12))[-1])
+    assert values["close"] == round(CLOSES[last], 2)
+
+
+def test_incremental_updates_match_a_full_seed():
+    days = SESSIONS.values.astype("datetime64[D]").astype(np.int64)
+    full = indicators.IndicatorState(days, CLOSES, CLOSES + 1, CLOSES - 1)
+    for k in (1, 30, 300):
+        state = indicators.IndicatorState(days[:k], CLOSES[:k], CLOSES[:k] + 1, CLOSES[:k] - 1)
+        for bar in zip(days[k:].tolist(), CLOSES[k:].tolist(), (CLOSES[k:] + 1).tolist(), (CLOSES[k:] - 1).tolist()):
+            state.update(*bar)
+        assert state._snapshot() == full.snapshot
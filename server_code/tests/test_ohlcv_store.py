@@ -0,0 +1,84 @@
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ohlcv_store
+
+TICKER = "TEST.NS"
+SESSIONS = pd.bdate_range("2024-01-01", "2024-06-28")
+CLOSES = 1000 + np.arange(len(SESSIONS), dtype=np.float64)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Empty OHLCV store whose downloader serves `upstream["closes"]`, and a settable 'last final session'."""
+    upstream = {"closes": CLOSES}
+    clock = {"session": None}
+
+    def download(ticker_symbol, start, end):
+        keep = (SESSIONS.date >= start) & (SESSIONS.date <= end)
+        if not keep.any():
+            return None
+        bars = {"Date": SESSIONS[keep].values.astype("datetime64[D]").astype(np.int64)}
+        for column in ohlcv_store.COLUMNS:
+            bars[column] = upstream["closes"][keep].copy()
+        return bars
+
+    monkeypatch.setattr(ohlcv_store, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(ohlcv_store, "_synced", {})
+    monkeypatch.setattr(ohlcv_store, "_download", download)
+    monkeypatch.setattr(ohlcv_store, "last_final_session", lambda now=None: clock["session"])
+    return clock, upstream
+
+
+def _closes_through(closes, day):
+    return closes[SESSIONS.date <= day]
+
+
+def test_split_resync_replaces_the_history_without_leftover_files(store):
+    clock, upstream = store
+    clock["session"] = date(2024, 5, 31)
+    np.testing.assert_array_equal(ohlcv_store.history(TICKER)["Close"].to_numpy(), _closes_through(CLOSES, date(2024, 5, 31)))
+
+    # A 1:2 split: upstream now reports every past close halved
+    upstream["closes"] = CLOSES / 2
+    clock["session"] = date(2024, 6, 7)
+    frame = ohlcv_store.history(TICKER)
+    expected = _closes_through(CLOSES / 2, date(2024, 6, 7))
+    np.testing.assert_array_equal(frame["Close"].to_numpy(), expected)
+    np.testing.assert_array_equal(frame["Open"].to_numpy(), expected)
+    assert frame.index[-1].date() == date(2024, 6, 7)
+
+    directory = ohlcv_store._ticker_dir(TICKER)
+    leftovers = [name for name in os.listdir(directory) if name.endswith(".tmp") or name == ohlcv_store.REPLACE_MARKER]
+    assert leftovers == []
+    for column in ("Date",) + ohlcv_store.COLUMNS:
+        assert os.path.getsize(ohlcv_store._column_path(directory, column)) == len(expected) * 8
+
+
+def _interrupted_replace(directory, bars, committed):
+    """Leave the state of a replace that wrote its temporary files but renamed none of them."""
+    for column in ("Date",) + ohlcv_store.COLUMNS:
+        bars[column].tofile(ohlcv_store._column_path(directory, column) + ".tmp")
+    if committed:
+        open(os.path.join(directory, ohlcv_store.REPLACE_MARKER), "wb").close()
+
+
+@pytest.mark.parametrize("committed", [True, False])
+def test_next_write_finishes_or_discards_an_interrupted_replace(store, committed):
+    clock, _ = store
+    clock["session"] = date(2024, 5, 31)
+    old = ohlcv_store.history(TICKER)["Close"].to_numpy()
+    directory = ohlcv_store._ticker_dir(TICKER)
+
+    new = ohlcv_store._read(directory)
+    new = {column: values / 2 if column != "Date" else values for column, values in new.items()}
+    _interrupted_replace(directory, new, committed)
+
+    ohlcv_store._append(directory, {column: values[:0] for column, values in new.items()})
+    stored = ohlcv_store._read(directory)["Close"]
+    np.testing.assert_array_equal(stored, old / 2 if committed else old)
+    assert [name for name in os.listdir(directory) if name.endswith(".tmp") or name == ohlcv_store.REPLACE_MARKER] == []
@@ -0,0 +1,46 @@
+import pytest
+from fuzzywuzzy import process
+
+from search_index import FuzzyIndex
+
+# Duplicates and near-duplicates make ties: process.extract breaks them by list position
+CHOICES = [
+    "TATA STEEL LIMITED",
+    "TATA MOTORS LIMITED",
+    "Tata Steel Limited",
+    "TATA POWER COMPANY LIMITED",
+    "TATA CONSULTANCY SERVICES LIMITED",
+    "INFOSYS LIMITED",
+    "HDFC BANK LIMITED",
+    "HDFC LIFE INSURANCE COMPANY LIMITED",
+    "ICICI BANK LIMITED",
+    "STATE BANK OF INDIA",
+    "BANK OF BARODA",
+    "BANK OF INDIA",
+    "RELIANCE INDUSTRIES LIMITED",
+    "RELIANCE POWER LIMITED",
+    "L&T FINANCE LIMITED",
+    "LARSEN & TOUBRO LIMITED",
+    "3M INDIA LIMITED",
+    "!!!",
+    "",
+]
+QUERIES = ["tata steel", "TATA", "bank of india", "hdfc", "reliance", "larsen toubro", "l&t", "3m", "infosys ltd", "zzz", "!!!"]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("limit", [1, 3, 5, len(CHOICES)])
+def test_extract_matches_fuzzywuzzy(query, limit):
+    assert FuzzyIndex(CHOICES).extract(query, limit=limit) == process.extract(query, CHOICES, limit=limit)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_extract_one_and_bests_match_fuzzywuzzy(query):
+    index = FuzzyIndex(CHOICES)
+    assert index.extract_one(query) == process.extractOne(query, CHOICES)
+    assert index.extract_bests(query, score_cutoff=60, limit=4) == process.extractBests(query, CHOICES, score_cutoff=60, limit=4)
+
+
+def test_ties_keep_list_order():
+    results = FuzzyIndex(CHOICES).extract("tata steel limited", limit=2)
+    assert results == [("TATA STEEL LIMITED", 100), ("Tata Steel Limited", 100)]
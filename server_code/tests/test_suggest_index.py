@@ -0,0 +1,56 @@
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+import suggest_index
+
+ENTRIES = [
+    {"name": "Tata Steel Ltd", "symbol": "TATASTEEL", "type": "equity", "key": "TATASTEEL"},
+    {"name": "Tata Motors Ltd", "symbol": "TATAMOTORS", "type": "equity", "key": "TATAMOTORS"},
+    {"name": "Tata Power Co Ltd", "symbol": "TATAPOWER", "type": "equity", "key": "TATAPOWER"},
+    {"name": "Titan Company Ltd", "symbol": "TITAN", "type": "equity", "key": "TITAN"},
+    {"name": "Infosys Ltd", "symbol": "INFY", "type": "equity", "key": "INFY"},
+]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Empty popularity and a settable monotonic clock for the short-prefix cache."""
+    now = {"t": 1000.0}
+    monkeypatch.setattr(suggest_index, "_popularity", Counter())
+    monkeypatch.setattr(suggest_index, "time", SimpleNamespace(monotonic=lambda: now["t"]))
+    return now
+
+
+def _symbols(results):
+    return [result["symbol"] for result in results]
+
+
+def test_short_prefix_is_ranked_by_popularity_and_cached(clock):
+    index = suggest_index.PrefixIndex(ENTRIES)
+    suggest_index.seed_popularity({"TATAPOWER": 5, "TITAN": 3, "TATAMOTORS": 1})
+
+    assert _symbols(index.search("t", limit=4)) == ["TATAPOWER", "TITAN", "TATAMOTORS", "TATASTEEL"]
+    assert _symbols(index.search("ta", limit=2)) == ["TATAPOWER", "TATAMOTORS"]
+    # A smaller limit is a prefix of the cached ranking, not a new one
+    assert _symbols(index.search("T", limit=1)) == ["TATAPOWER"]
+    # The cached top list matches an uncached ranking of the same prefix
+    assert index._short["T"][1][:4] == index._rank("T", 4)
+
+
+def test_short_prefix_ranking_follows_popularity_after_the_ttl(clock):
+    index = suggest_index.PrefixIndex(ENTRIES)
+    suggest_index.seed_popularity({"TATAPOWER": 5})
+    assert _symbols(index.search("ta", limit=1)) == ["TATAPOWER"]
+
+    for _ in range(10):
+        suggest_index.record_hit("TATASTEEL")
+    clock["t"] += suggest_index.SHORT_PREFIX_TTL - 1
+    assert _symbols(index.search("ta", limit=1)) == ["TATAPOWER"]  # still within the TTL
+
+    clock["t"] += 1
+    assert _symbols(index.search("ta", limit=1)) == ["TATASTEEL"]
+    # Longer prefixes are never cached and see the new popularity at once
+    suggest_index.record_hit("TATAMOTORS", 20)
+    assert _symbols(index.search("tat", limit=1)) == ["TATAMOTORS"]
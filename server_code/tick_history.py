@@ -0,0 +1,38 @@
+import numpy as np
+
+# ---------------- Tick history ---------------- #
+# Recent (timestamp, price) ticks per index for sparklines. Each ring is two
+# preallocated float64 arrays, so appending a tick never allocates and a ring
+# never grows: once full, the oldest tick is overwritten. CAPACITY covers a
+# full trading session (9:15-15:30) at one tick per minute.
+CAPACITY = 376
+
+
+class TickRing:
+    __slots__ = ("times", "prices", "next", "count")
+
+    def __init__(self, capacity=CAPACITY):
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.next = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, price):
+        i = self.next
+        self.times[i] = timestamp
+        self.prices[i] = price
+        self.next = (i + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+
+    def last_price(self):
+        """The newest tick's price, or None if the ring is empty."""
+        return float(self.prices[self.next - 1]) if self.count else None
+
+    def recent(self, n) -> dict:
+        """The last n ticks, oldest first, as {"t": [epoch seconds], "p": [prices]}."""
+        n = min(n, self.count)
+        positions = (self.next - n + np.arange(n)) % len(self.times)
+        return {"t": self.times[positions].astype(np.int64).tolist(), "p": self.prices[positions].tolist()}